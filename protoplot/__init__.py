@@ -1,2 +1,20 @@
 from .model import Axis, Legend, Plot, Point, Series, Text
-from .renderer import MplRenderer
\ No newline at end of file
+
+# The renderers import Matplotlib, which is slow, so they are only imported when
+# they are first accessed (PEP 562). Building models does not need them.
+_lazy_attributes = {
+    "IncrementalRenderer": "protoplot.renderer",
+    "MplRenderer"        : "protoplot.renderer",
+}
+
+def __getattr__(name):
+    if name not in _lazy_attributes:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    import importlib
+    value = getattr(importlib.import_module(_lazy_attributes[name]), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import types
+import warnings
+
+import numpy as np
+
+from protoplot.data.columnar import Column
+
+_primitive_types = (type(None), bool, int, float, complex, str, bytes, type(Ellipsis))
+
+def _describe(value):
+    '''
+    Returns a string describing a read argument for the cache key, which is
+    the same in every process as long as the argument is unchanged. Raises
+    ValueError if the argument can't be described that way.
+
+    Functions (including lambdas) are described by their code, constants,
+    defaults, and closure values, so a changed function gives a different key.
+    Builtin functions, NumPy ufuncs, and classes are described by their
+    qualified name.
+    '''
+    if isinstance(value, _primitive_types):
+        return repr(value)
+    elif isinstance(value, dict):
+        items = sorted((str(k), _describe(v)) for k, v in value.items())
+        return "{" + ", ".join("%s: %s" % item for item in items) + "}"
+    elif isinstance(value, (list, tuple)):
+        return "[" + ", ".join(_describe(v) for v in value) + "]"
+    elif isinstance(value, (set, frozenset)):
+        return "{" + ", ".join(sorted(_describe(v) for v in value)) + "}"
+    elif isinstance(value, types.FunctionType):
+        try:
+            closure = [cell.cell_contents for cell in value.__closure__ or ()]
+        except ValueError: # Empty cell
+            raise ValueError("Can't describe function %s" % value.__qualname__)
+        return "%s.%s(%s, %s, %s, %s)" % (value.__module__, value.__qualname__,
+            _describe_code(value.__code__), _describe(value.__defaults__),
+            _describe(value.__kwdefaults__), _describe(closure))
+    elif isinstance(value, (type, types.BuiltinFunctionType)):
+        return "%s.%s" % (value.__module__, value.__qualname__)
+    elif isinstance(value, np.ufunc):
+        return "numpy.%s" % value.__name__
+    else:
+        raise ValueError("Can't describe %s for the cache key" % type(value).__name__)
+
+def _describe_code(code):
+    constants = [_describe_code(constant) if isinstance(constant, types.CodeType)
+        else _describe(constant) for constant in code.co_consts]
+    return "code(%s, %s, [%s])" % (code.co_code.hex(), _describe(code.co_names),
+        ", ".join(constants))
+
+class TableCache:
+    '''
+    An on-disk cache for tables read from files.
+
+    A cached table is stored in a directory below the cache directory, with
+    one .npy file for the values and one for the missing value mask of each
+    column, plus a JSON file with the header row and the column names. Cached
+    tables are loaded with columnar storage, and the columns are memory-mapped,
+    so loading is nearly instant and does not copy the data. (Columns with
+    mixed value types are stored as object arrays, which can't be
+    memory-mapped and are loaded into memory.)
+
+    Cached tables are keyed by the absolute path, size and modification time of
+    the source file, the read method, and the read arguments (including
+    column_setup), so a modified file or different arguments cause the file to
+    be read again.
+
+    Use it via the cache argument of Table.from_csv and Table.from_excel.
+    '''
+    def __init__(self, directory):
+        self.directory = directory
+
+    def key(self, file_name, method, args, kwargs):
+        stat = os.stat(file_name)
+        description = "\n".join([
+            os.path.abspath(file_name),
+            str(stat.st_size),
+            str(stat.st_mtime_ns),
+            method,
+            _describe(list(args)),
+            _describe(kwargs),
+        ])
+        return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+    def read(self, table_class, method, file_name, *args, **kwargs):
+        '''
+        Returns the cached table read by calling the method (e. g. "read_csv")
+        of a new instance of table_class with the specified arguments, reading
+        the file and storing the table in the cache if it is not cached yet.
+        '''
+        # The table is always read with columnar storage
+        kwargs.pop("columnar", None)
+
+        try:
+            key = self.key(file_name, method, args, kwargs)
+        except ValueError as e:
+            # Caching would store a new entry on each run, or return a stale
+            # table after the argument has changed
+            warnings.warn("Not caching %s: %s" % (file_name, e))
+            table = table_class()
+            getattr(table, method)(file_name, *args, columnar=True, **kwargs)
+            return table
+
+        table = self.load(key, table_class)
+
+        if table is None:
+            table = table_class()
+            getattr(table, method)(file_name, *args, columnar=True, **kwargs)
+            self.store(key, table)
+
+        table._file_name = file_name
+        return table
+
+    def load(self, key, table_class):
+        '''
+        Returns the table with the specified key, or None if it is not in the
+        cache.
+        '''
+        path = os.path.join(self.directory, key)
+        if not os.path.isdir(path):
+            return None
+
+        with open(os.path.join(path, "table.json"), encoding="utf-8") as json_file:
+            meta = json.load(json_file)
+
+        columns = []
+        for index, mappable in enumerate(meta["mappable"]):
+            mmap_mode = "r" if mappable else None
+            values = np.load(os.path.join(path, "values_%d.npy" % index), mmap_mode=mmap_mode,
+                allow_pickle=not mappable)
+            mask = np.load(os.path.join(path, "mask_%d.npy" % index), mmap_mode="r")
+            columns.append(Column(values, mask))
+
+        return table_class.from_columns(columns, meta["header_row"], meta["column_names"])
+
+    def store(self, key, table):
+        '''
+        Stores a table with columnar storage under the specified key.
+        '''
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Write to a temporary directory and rename it when complete, so an
+        # incomplete entry is never loaded.
+        temp_path = tempfile.mkdtemp(dir=self.directory)
+        try:
+            meta = {
+                "header_row"  : table._header_row,
+                "column_names": table._column_names,
+                "mappable"    : [column.values.dtype != object for column in table._columns],
+            }
+            with open(os.path.join(temp_path, "table.json"), "w", encoding="utf-8") as json_file:
+                json.dump(meta, json_file)
+
+            for index, column in enumerate(table._columns):
+                np.save(os.path.join(temp_path, "values_%d.npy" % index), column.values,
+                    allow_pickle=column.values.dtype == object)
+                np.save(os.path.join(temp_path, "mask_%d.npy" % index), column.mask)
+
+            os.rename(temp_path, os.path.join(self.directory, key))
+        except OSError:
+            # Another process may have stored the same table in the meantime
+            shutil.rmtree(temp_path, ignore_errors=True)
+            if not os.path.isdir(os.path.join(self.directory, key)):
+                raise
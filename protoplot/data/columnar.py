@@ -0,0 +1,379 @@
+import numbers
+
+import numpy as np
+
+def _fill_value(datatype):
+    if datatype is float:
+        return np.nan
+    elif datatype is int:
+        return 0
+    elif datatype is str:
+        return ""
+    else:
+        return None
+
+def _array(values, datatype):
+    if datatype is float:
+        return np.array(values, dtype=np.float64)
+    elif datatype is int:
+        return np.array(values, dtype=np.int64)
+    elif datatype is str:
+        return np.array(values, dtype=str)
+    else:
+        result = np.empty(len(values), dtype=object)
+        result[:] = values
+        return result
+
+def _common_type(values):
+    '''
+    Returns the Python type (float, int, or str) that all values have, or None
+    if the values have different types or a type for which there is no typed
+    array. None values are ignored.
+    '''
+    types = set(map(type, values))
+    types.discard(type(None))
+
+    if types == {str}:
+        return str
+    elif types and all(issubclass(t, numbers.Integral) and t is not bool for t in types):
+        return int
+    elif types and all(issubclass(t, numbers.Real) and t is not bool for t in types):
+        return float
+    elif not types:
+        return str
+    else:
+        return None
+
+
+def parse_floats(values, mask = None):
+    '''
+    Parses a sequence of values (typically strings read from a file) to floats
+    and returns a tuple (float array, missing value mask).
+
+    Strings may use a comma as decimal separator, and "", "-", and None are
+    missing values. An existing mask of missing values can be specified.
+    '''
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind == 'f':
+            return values, (mask if mask is not None else np.zeros(len(values), dtype=bool))
+        elif values.dtype.kind in 'iub':
+            return values.astype(np.float64), (mask if mask is not None else np.zeros(len(values), dtype=bool))
+        values = values.tolist()
+
+    # Join the strings to replace all decimal commas at once, then let NumPy
+    # parse the list. This is not possible if there are values other than
+    # strings, or if a string contains a line break.
+    try:
+        text = "\n".join(values)
+    except TypeError:
+        return _parse_floats_individually(values, mask)
+
+    if "," in text:
+        text = text.replace(",", ".")
+    strings = text.split("\n")
+    if len(strings) != len(values):
+        return _parse_floats_individually(values, mask)
+
+    missing = np.fromiter((string == "" or string == "-" for string in strings),
+        dtype=bool, count=len(strings))
+    if mask is not None:
+        missing |= mask
+    for index in np.flatnonzero(missing).tolist():
+        strings[index] = "nan"
+
+    return np.array(strings, dtype=np.float64), missing
+
+def _parse_floats_individually(values, mask):
+    from protoplot.data.table import _to_float
+
+    if mask is None:
+        mask = np.zeros(len(values), dtype=bool)
+
+    floats = [None if missing else _to_float(value) for value, missing in zip(values, mask.tolist())]
+    mask = np.fromiter((value is None for value in floats), dtype=bool, count=len(floats))
+    return np.array([np.nan if value is None else value for value in floats], dtype=np.float64), mask
+
+class Column:
+    '''
+    A table column, stored as a typed NumPy array of values and a boolean mask
+    that is True for missing values (None in row form). The value of a missing
+    entry in the array is unspecified (typically NaN for float columns and ""
+    for string columns).
+
+    Columns are never modified in place: all operations return new columns, so
+    columns (and their arrays) can be shared between tables.
+
+    A column created by take is a view: it only stores the row indices and a
+    reference to the original column, and the values and mask are gathered on
+    first access. Taking rows from a view combines the indices, so chained
+    filters do not copy the data.
+    '''
+    def __init__(self, values, mask = None):
+        self._values = values
+        if mask is None:
+            self._mask = np.zeros(len(values), dtype=bool)
+        else:
+            self._mask = mask
+
+        # For a view: the original column and the row indices
+        self._base  = None
+        self._index = None
+
+    @classmethod
+    def _view(cls, base, index):
+        column = cls.__new__(cls)
+        column._values = None
+        column._mask   = None
+        column._base   = base
+        column._index  = index
+        return column
+
+    @classmethod
+    def from_list(cls, values):
+        '''
+        Creates a column from a sequence of Python values, where None
+        represents a missing value. The array type is determined from the
+        values.
+        '''
+        mask = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+
+        datatype = _common_type(values)
+        if mask.any():
+            fill = _fill_value(datatype)
+            values = [fill if value is None else value for value in values]
+
+        return cls(_array(values, datatype), mask)
+
+    def is_view(self):
+        return self._base is not None
+
+    @property
+    def values(self):
+        if self._base is not None:
+            self._materialize()
+        return self._values
+
+    @property
+    def mask(self):
+        if self._base is not None:
+            self._materialize()
+        return self._mask
+
+    def _materialize(self):
+        # Gathers the values of a view and releases the original column
+        self._values = self._base.values[self._index]
+        self._mask   = self._base.mask  [self._index]
+        self._base   = None
+        self._index  = None
+
+    def __len__(self):
+        if self._base is not None:
+            return len(self._index)
+        return len(self._values)
+
+    def to_list(self):
+        '''
+        Returns the values as a list of Python values, with None for missing
+        values.
+        '''
+        result = self.values.tolist()
+        for index in np.flatnonzero(self.mask).tolist():
+            result[index] = None
+        return result
+
+    def take(self, indices):
+        '''
+        Returns a view of the column with the values at the specified indices
+        (an index array or a boolean array). The values are not copied until
+        they are accessed.
+        '''
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+
+        if self._base is not None:
+            return Column._view(self._base, self._index[indices])
+        else:
+            return Column._view(self, indices)
+
+
+    ############
+    ## Typing ##
+    ############
+
+    def astype(self, datatype):
+        '''
+        Converts the present (non-missing) values to the specified type.
+
+        float, int, and str are converted vectorized. For float, strings with a
+        comma decimal separator are accepted and "" and "-" are missing. Any
+        other datatype is called for each present value.
+        '''
+        present = ~self.mask
+
+        if datatype is float:
+            return self._to_float()
+        elif datatype in (int, str) and self.values.dtype != object:
+            converted = self.values[present].astype(datatype)
+            values = np.full(len(self), _fill_value(datatype), dtype=converted.dtype)
+            values[present] = converted
+            return Column(values, self.mask)
+        else:
+            return self.map(datatype)
+
+    def _to_float(self):
+        if self.values.dtype.kind == 'f':
+            return self
+
+        return Column(*parse_floats(self.values, self.mask))
+
+
+    #############
+    ## Mapping ##
+    #############
+
+    def map(self, function, skip_none = True, vectorized = False):
+        '''
+        Applies the function to the values and returns the resulting column.
+
+        If vectorized is True (or function is a NumPy ufunc), the function is
+        called once with an array of the present values, and must return an
+        array of the same length. Missing values remain missing. Otherwise, the
+        function is called for each value, including missing values (as None)
+        unless skip_none is True.
+        '''
+        present = ~self.mask
+
+        if vectorized or isinstance(function, np.ufunc):
+            mapped = np.asarray(function(self.values[present]))
+            values = np.empty(len(self), dtype=mapped.dtype)
+            values[present] = mapped
+            if self.mask.any():
+                values[self.mask] = np.zeros(1, dtype=mapped.dtype)[0]
+            return Column(values, self.mask)
+
+        values = self.to_list()
+        if skip_none:
+            values = [None if value is None else function(value) for value in values]
+        else:
+            values = [function(value) for value in values]
+        return Column.from_list(values)
+
+
+    ###############
+    ## Filtering ##
+    ###############
+
+    def equals(self, value):
+        '''
+        Returns a boolean array that is True where the column value equals the
+        specified value. None matches missing values.
+        '''
+        if value is None:
+            return self.mask.copy()
+
+        if self.values.dtype == object or not np.isscalar(value):
+            # Compare Python values, as NumPy would broadcast sequences
+            result = np.fromiter((v == value for v in self.values.tolist()), dtype=bool, count=len(self))
+        else:
+            result = self.values == value
+            if not isinstance(result, np.ndarray):
+                # Not comparable (e. g. a string with a float array)
+                result = np.zeros(len(self), dtype=bool)
+
+        return result & ~self.mask
+
+
+################
+## Conversion ##
+################
+
+def columns_from_rows(rows, column_count):
+    '''
+    Creates a list of columns from a list of rows, which must all have
+    column_count values.
+    '''
+    if not rows:
+        return [Column(np.array([], dtype=str)) for _ in range(column_count)]
+
+    return [Column.from_list(values) for values in zip(*rows)]
+
+def rows_from_columns(columns):
+    '''
+    Returns an iterator over the rows (as lists) of the columns.
+    '''
+    return map(list, zip(*(column.to_list() for column in columns)))
+
+def concatenate(column_lists):
+    '''
+    Concatenates lists of columns, which must all have the same number of
+    columns, and returns a list of columns. Columns of different types are
+    concatenated as object arrays.
+    '''
+    result = []
+
+    for parts in zip(*column_lists):
+        # Empty parts (e. g. untyped string columns of empty chunks) don't
+        # determine the type
+        parts = [part for part in parts if len(part) > 0] or parts[:1]
+
+        # Strings and numbers are concatenated as objects, as NumPy would
+        # convert the numbers to strings
+        kinds = {part.values.dtype.kind for part in parts}
+        if 'U' in kinds and len(kinds) > 1:
+            values = np.concatenate([part.values.astype(object) for part in parts])
+        else:
+            try:
+                values = np.concatenate([part.values for part in parts])
+            except (TypeError, ValueError):
+                values = np.concatenate([part.values.astype(object) for part in parts])
+        mask = np.concatenate([part.mask for part in parts])
+        result.append(Column(values, mask))
+
+    return result
+
+def partition(columns, group_ids, group_count):
+    '''
+    Partitions the rows of the columns by group_ids (a sequence with a group
+    number from 0 to group_count-1 for each row), preserving the row order
+    within each group. Returns a list of lists of columns, one for each group.
+
+    The columns of the groups are views (see Column.take) that share a single
+    array of row indices, sorted by group.
+    '''
+    group_ids = np.asarray(group_ids, dtype=np.intp)
+    order = np.argsort(group_ids, kind="stable")
+    ends = np.cumsum(np.bincount(group_ids, minlength=group_count)).tolist()
+    starts = [0] + ends[:-1]
+
+    return [[column.take(order[start:end]) for column in columns]
+        for start, end in zip(starts, ends)]
+
+def row_count(columns):
+    if columns:
+        return len(columns[0])
+    else:
+        return 0
+
+
+###############
+## Filtering ##
+###############
+
+def select_equal(columns, conditions):
+    '''
+    Returns a boolean array that is True for the rows where each column
+    matches the value. conditions is a list of (column_index, value).
+    '''
+    selection = np.ones(row_count(columns), dtype=bool)
+    for column_index, value in conditions:
+        selection &= columns[column_index].equals(value)
+    return selection
+
+def select_function(columns, function):
+    '''
+    Returns a boolean array that is True for the rows where the function,
+    called with the values of the row as arguments, returns a true value.
+    '''
+    return np.fromiter((bool(function(*row)) for row in rows_from_columns(columns)),
+        dtype=bool, count=row_count(columns))
@@ -0,0 +1,270 @@
+import ast
+import functools
+import operator
+
+import numpy as np
+
+from protoplot.data.columnar import Column
+
+_comparisons = {
+    ast.Eq   : operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt   : operator.lt,
+    ast.LtE  : operator.le,
+    ast.Gt   : operator.gt,
+    ast.GtE  : operator.ge,
+}
+
+_arithmetic = {
+    ast.Add     : operator.add,
+    ast.Sub     : operator.sub,
+    ast.Mult    : operator.mul,
+    ast.Div     : operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod     : operator.mod,
+    ast.Pow     : operator.pow,
+}
+
+_unary = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+_functions = {
+    "abs": np.abs,
+}
+
+_constant_types = (int, float, str, bool, type(None))
+
+_int64 = np.iinfo(np.int64)
+
+def _number(value):
+    # Numbers are NumPy scalars, so arithmetic on constants has the same
+    # bounded cost as on columns (e. g. 9**9**9**9 overflows instead of
+    # computing a huge Python int)
+    if isinstance(value, bool):
+        return np.bool_(value)
+    elif isinstance(value, int):
+        return np.int64(value)
+    elif isinstance(value, float):
+        return np.float64(value)
+    return value
+
+def _is_string(operand):
+    if isinstance(operand, Column):
+        return operand.values.dtype.kind in "OSU"
+    return isinstance(operand, str)
+
+class Expression:
+    '''
+    A filter expression over column names, e. g.
+        "temp > 40 and mode == 'fast'"
+
+    The expression is parsed once and evaluated vectorized over whole columns.
+    It is not evaluated by Python: only the following elements are allowed,
+    anything else raises a ValueError when the expression is created:
+      * Column names and constants (numbers, strings, True, False, None)
+      * Comparisons (==, !=, <, <=, >, >=, also chained), in and not in with a
+        list or tuple of constants
+      * and, or, not
+      * Arithmetic (+, -, *, /, //, %, **) on numbers and abs()
+
+    Numbers are evaluated as NumPy scalars and arrays (integer constants must
+    fit into 64 bits), so the cost of evaluating an expression is bounded.
+
+    A comparison with a missing value is false, except for "== None" (which
+    matches missing values) and "!= None". The result of arithmetic with a
+    missing value is missing.
+    '''
+    def __init__(self, source):
+        self.source = source
+        self.names = []
+        self._tree = ast.parse(source.strip(), mode="eval").body
+        self._check(self._tree)
+
+    def __repr__(self):
+        return "Expression(%r)" % self.source
+
+    def _check(self, node):
+        # Raises ValueError if the node contains unsupported elements, and
+        # collects the column names
+        if isinstance(node, ast.Name):
+            if node.id not in self.names:
+                self.names.append(node.id)
+            return
+        elif isinstance(node, ast.Constant):
+            if not isinstance(node.value, _constant_types):
+                raise ValueError("Unsupported constant in %s: %r" % (self.source, node.value))
+            if isinstance(node.value, int) and not _int64.min <= node.value <= _int64.max:
+                raise ValueError("Integer constant out of range in %s" % self.source)
+            return
+        elif isinstance(node, ast.BoolOp):
+            children = node.values
+        elif isinstance(node, ast.UnaryOp) and (isinstance(node.op, ast.Not) or type(node.op) in _unary):
+            children = [node.operand]
+        elif isinstance(node, ast.BinOp) and type(node.op) in _arithmetic:
+            for operand in [node.left, node.right]:
+                if isinstance(operand, ast.Constant) and isinstance(operand.value, str):
+                    raise ValueError("Arithmetic on strings is not supported: %s" % self.source)
+            children = [node.left, node.right]
+        elif isinstance(node, ast.Compare):
+            for op, comparator in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.In, ast.NotIn)):
+                    if not (isinstance(comparator, (ast.List, ast.Tuple)) and
+                            all(isinstance(e, ast.Constant) for e in comparator.elts)):
+                        raise ValueError("in requires a list of constants: %s" % self.source)
+                elif type(op) not in _comparisons:
+                    raise ValueError("Unsupported comparison in %s" % self.source)
+            children = [node.left] + [c for c in node.comparators if not isinstance(c, (ast.List, ast.Tuple))]
+        elif isinstance(node, ast.Call):
+            if not (isinstance(node.func, ast.Name) and node.func.id in _functions
+                    and len(node.args) == 1 and not node.keywords):
+                raise ValueError("Unsupported function call in %s" % self.source)
+            children = node.args
+        else:
+            raise ValueError("Unsupported element in %s: %s" % (self.source, type(node).__name__))
+
+        for child in children:
+            self._check(child)
+
+
+    ################
+    ## Evaluation ##
+    ################
+
+    def evaluate(self, columns, row_count):
+        '''
+        Evaluates the expression and returns a boolean array with row_count
+        values. columns is a dict(name: columnar.Column) with a column for
+        each name in self.names.
+        '''
+        with np.errstate(all="ignore"):
+            result = self._evaluate(self._tree, columns)
+        return _truth(result, row_count)
+
+    def _evaluate(self, node, columns):
+        # Returns a Column or a scalar
+        if isinstance(node, ast.Name):
+            return columns[node.id]
+        elif isinstance(node, ast.Constant):
+            return _number(node.value)
+        elif isinstance(node, ast.BoolOp):
+            values = [self._evaluate(value, columns) for value in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return _apply(lambda *v: functools.reduce(combine, v), *map(_bool, values))
+        elif isinstance(node, ast.UnaryOp):
+            operand = self._evaluate(node.operand, columns)
+            if isinstance(node.op, ast.Not):
+                return _apply(np.logical_not, _bool(operand))
+            return _apply(_unary[type(node.op)], operand)
+        elif isinstance(node, ast.BinOp):
+            left  = self._evaluate(node.left , columns)
+            right = self._evaluate(node.right, columns)
+            if _is_string(left) or _is_string(right):
+                raise ValueError("Arithmetic on strings is not supported: %s" % self.source)
+            return _apply(_arithmetic[type(node.op)], left, right)
+        elif isinstance(node, ast.Compare):
+            results = []
+            left = self._evaluate(node.left, columns)
+            for op, comparator in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.In, ast.NotIn)):
+                    right = [element.value for element in comparator.elts]
+                    result = _contains(left, right)
+                    if isinstance(op, ast.NotIn):
+                        result = _apply(np.logical_not, result)
+                else:
+                    right = self._evaluate(comparator, columns)
+                    try:
+                        result = _compare(_comparisons[type(op)], left, right)
+                    except TypeError:
+                        # E. g. ordering a string with a number
+                        raise ValueError("Comparison of incompatible types: %s" % self.source) from None
+                results.append(result)
+                left = right
+            return _apply(lambda *v: functools.reduce(np.logical_and, v), *results)
+        elif isinstance(node, ast.Call):
+            return _apply(_functions[node.func.id], self._evaluate(node.args[0], columns))
+
+def _apply(function, *operands):
+    # Applies a vectorized function to the present values of the operands
+    # (columns or scalars). Returns a column, which is missing where any
+    # column operand is missing, or a scalar if all operands are scalars.
+    masks = [operand.mask for operand in operands if isinstance(operand, Column)]
+    if not masks:
+        return function(*operands)
+
+    mask = functools.reduce(np.logical_or, masks)
+    if not mask.any():
+        return Column(np.asarray(function(*(_values(operand) for operand in operands))), mask)
+
+    present = ~mask
+    result = np.asarray(function(*(_values(operand, present) for operand in operands)))
+    values = np.zeros(len(mask), dtype=result.dtype)
+    values[present] = result
+    return Column(values, mask)
+
+def _values(operand, present = None):
+    if not isinstance(operand, Column):
+        return operand
+    elif present is None:
+        return operand.values
+    else:
+        return operand.values[present]
+
+def _bool(operand):
+    # Returns a boolean column (missing values are false) or a bool
+    if isinstance(operand, Column):
+        values = operand.values.astype(bool) & ~operand.mask
+        return Column(values, np.zeros(len(values), dtype=bool))
+    return bool(operand)
+
+def _compare(op, left, right):
+    # Comparisons with None check for missing values
+    if right is None or left is None:
+        other = left if right is None else right
+        if not isinstance(other, Column):
+            return op(other, None)
+        if op is operator.eq:
+            return Column(other.mask.copy(), np.zeros(len(other), dtype=bool))
+        elif op is operator.ne:
+            return Column(~other.mask, np.zeros(len(other), dtype=bool))
+        else:
+            raise ValueError("None can only be compared with == and !=")
+
+    result = _apply(op, left, right)
+    if isinstance(result, Column) and result.values.ndim == 0:
+        # Older NumPy versions return a single value if the types are not
+        # comparable (e. g. a string with a number array)
+        result = Column(np.full(len(result.mask), bool(result.values)), result.mask)
+    return _bool(result)
+
+def _contains(operand, values):
+    includes_none = None in values
+    values = [value for value in values if value is not None]
+
+    if not isinstance(operand, Column):
+        return operand in values or (includes_none and operand is None)
+
+    if operand.values.dtype == object:
+        result = np.fromiter((value in values for value in operand.values.tolist()),
+            dtype=bool, count=len(operand))
+    else:
+        result = np.isin(operand.values, values)
+    result &= ~operand.mask
+    if includes_none:
+        result |= operand.mask
+    return Column(result, np.zeros(len(result), dtype=bool))
+
+def _truth(result, row_count):
+    result = _bool(result)
+    if isinstance(result, Column):
+        return result.values
+    return np.full(row_count, result, dtype=bool)
+
+@functools.lru_cache(maxsize=256)
+def compile_expression(source):
+    '''
+    Returns the Expression for the source, reusing previously compiled
+    expressions.
+    '''
+    return Expression(source)
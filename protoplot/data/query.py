@@ -0,0 +1,280 @@
+from protoplot.data.table import Table
+
+class _TableSource:
+    '''
+    The source of a query on a table.
+    '''
+    def __init__(self, table):
+        self.table = table
+
+    def schema(self):
+        # Returns (header row or None, column names)
+        return self.table._header_row, list(self.table._column_names)
+
+    def tables(self, column_indices):
+        # Yields tables with the specified columns of the source, in order.
+        # The table is a view, so the query does not change the source table.
+        yield self.table.columns(column_indices)
+
+class _CsvSource:
+    '''
+    The source of a query on a CSV file. kwargs are the arguments for
+    Table.read_csv.
+    '''
+    def __init__(self, file_name, kwargs):
+        self.file_name = file_name
+        self.kwargs = kwargs
+
+    def schema(self):
+        # Read the first row to determine the number of columns
+        kwargs = dict(self.kwargs)
+        kwargs.pop("chunk_size"  , None)
+        kwargs.pop("column_setup", None)
+        kwargs.pop("cache"       , None)
+        first = next(Table.iter_csv(self.file_name, 1, **kwargs), None)
+        if first is None:
+            return None, []
+
+        column_names = [None] * len(first._column_names)
+        for setup in self.kwargs.get("column_setup") or []:
+            if setup.get("name") is not None:
+                column_names[setup["index"]] = setup["name"]
+
+        return first._header_row, column_names
+
+    def tables(self, column_indices):
+        kwargs = dict(self.kwargs, usecols=column_indices)
+
+        chunk_size = kwargs.pop("chunk_size", None)
+        if chunk_size is None:
+            yield Table.from_csv(self.file_name, **kwargs)
+        else:
+            kwargs.pop("cache", None)
+            yield from Table.iter_csv(self.file_name, chunk_size, **kwargs)
+
+class Query:
+    '''
+    A lazy query on a table (see Table.lazy) or a CSV file (see
+    Table.scan_csv).
+
+    columns, filter, and map_column work like the respective methods of Table,
+    but only add a step to the query and return a new query. The query is
+    executed when its result is used: by collect, column (e. g. when the query
+    is used as series data), data_rows, records, or group_by. Before execution,
+    the plan is optimized:
+      * Filters are moved before maps of columns that they don't use.
+      * Only the columns used by the result or by a filter are read, and maps
+        of other columns are skipped. For a CSV file, the other columns are not
+        set up by column_setup, so their values are never converted.
+    For a CSV file read with chunk_size, the steps are executed for each chunk,
+    so only the selected rows and columns of the file are kept in memory.
+
+    The result is stored, so a query is executed at most once.
+    '''
+    def __init__(self, source, schema=None, steps=(), column_ids=None):
+        self._source = source
+
+        # The current columns of the query: for each column, the index of the
+        # source column, the header, and the name
+        if schema is None:
+            header_row, column_names = source.schema()
+            column_ids = list(range(len(column_names)))
+            schema = (header_row, column_names)
+        self._schema = schema
+        self._column_ids = column_ids
+
+        # The steps of the query, each one of:
+        #   ("filter", column_ids, conditions): conditions is a function
+        #     called with the values of the columns, a list of
+        #     (column_id, value), or a tuple (expression, dict(name: column_id))
+        #   ("map", column_id, (function, skip_none, vectorized))
+        self._steps = tuple(steps)
+
+        self._result = None
+
+    def _derive(self, schema=None, step=None, column_ids=None):
+        # Returns a new query with the changed schema and the additional step
+        steps = self._steps + ((step,) if step is not None else ())
+        if schema is None:
+            schema = self._schema
+        if column_ids is None:
+            column_ids = self._column_ids
+        return Query(self._source, schema, steps, column_ids)
+
+
+    #############
+    ## Columns ##
+    #############
+
+    def column_count(self):
+        return len(self._column_ids)
+
+    def resolve_column(self, columnspec):
+        '''
+        Resolves a column like Table.resolve_column and returns its index in
+        the current columns of the query.
+        '''
+        _, column_names = self._schema
+        if isinstance(columnspec, int):
+            index = columnspec
+            if index >= self.column_count():
+                raise ValueError("Column number {} out of range".format(index))
+            return index
+        elif isinstance(columnspec, str):
+            name = columnspec
+            if name not in column_names:
+                raise ValueError('Column name "%s" does not exist' % name)
+            return column_names.index(name)
+        else:
+            raise Exception("Invalid column specification {}".format(repr(columnspec)))
+
+    def _column_id(self, columnspec):
+        return self._column_ids[self.resolve_column(columnspec)]
+
+
+    ###########
+    ## Steps ##
+    ###########
+
+    def columns(self, columnspecs):
+        '''
+        See Table.columns.
+        '''
+        indices = [self.resolve_column(columnspec) for columnspec in columnspecs]
+        headers, column_names = self._schema
+
+        if headers is not None:
+            new_headers      = [headers[i] for i in indices]
+            new_column_names = list(new_headers)
+        else:
+            new_headers      = None
+            new_column_names = [column_names[i] for i in indices]
+
+        column_ids = [self._column_ids[i] for i in indices]
+        return self._derive((new_headers, new_column_names), column_ids=column_ids)
+
+    def filter(self, conditions):
+        '''
+        See Table.filter.
+        '''
+        if isinstance(conditions, dict):
+            conditions = list(conditions.items())
+
+        if isinstance(conditions, str):
+            from protoplot.data.expression import compile_expression
+            expression = compile_expression(conditions)
+            column_ids = {name: self._column_id(name) for name in expression.names}
+            step = ("filter", list(column_ids.values()), (expression, column_ids))
+        elif hasattr(conditions, '__call__'):
+            step = ("filter", list(self._column_ids), conditions)
+        elif isinstance(conditions, list):
+            conditions = [(self._column_id(columnspec), value) for columnspec, value in conditions]
+            step = ("filter", [column_id for column_id, _ in conditions], conditions)
+        else:
+            raise ValueError("Unsupported conditions value: %s" % repr(conditions))
+
+        return self._derive(step=step)
+
+    def map_column(self, columnspec, function, skip_none = True, vectorized = False):
+        '''
+        See Table.map_column.
+        '''
+        step = ("map", self._column_id(columnspec), (function, skip_none, vectorized))
+        return self._derive(step=step)
+
+
+    ##############
+    ## Planning ##
+    ##############
+
+    def plan(self):
+        '''
+        Returns the optimized plan of the query as a tuple (column_ids, steps):
+        the indices of the source columns that are read, and the steps.
+        '''
+        steps = []
+        for step in self._steps:
+            if step[0] == "filter":
+                # Move the filter before maps of columns that it doesn't use
+                position = len(steps)
+                while position > 0 and steps[position-1][0] == "map" and steps[position-1][1] not in step[1]:
+                    position -= 1
+                steps.insert(position, step)
+            else:
+                steps.append(step)
+
+        # Only read the columns of the result and the columns used by filters
+        used = set(self._column_ids)
+        for kind, column_ids, _ in steps:
+            if kind == "filter":
+                used.update(column_ids)
+
+        steps = [step for step in steps if step[0] == "filter" or step[1] in used]
+        return sorted(used), steps
+
+    def _execute(self, table, column_ids, steps):
+        # Executes the steps on a table with the specified source columns
+        position = {column_id: index for index, column_id in enumerate(column_ids)}
+
+        for kind, ids, argument in steps:
+            if kind == "filter" and hasattr(argument, '__call__'):
+                indices = [position[column_id] for column_id in ids]
+                if indices == list(range(table.column_count())):
+                    table = table.filter(argument)
+                else:
+                    table = table.filter(lambda *row, function=argument, indices=indices:
+                        function(*[row[i] for i in indices]))
+            elif kind == "filter" and isinstance(argument, tuple):
+                expression, names = argument
+                columns = {name: position[column_id] for name, column_id in names.items()}
+                table = table._filter_expression(expression, columns)
+            elif kind == "filter":
+                table = table.filter([(position[column_id], value) for column_id, value in argument])
+            else:
+                table.map_column(position[ids], *argument)
+
+        _, column_names = self._schema
+        result = table.columns([position[column_id] for column_id in self._column_ids])
+        result._column_names = list(column_names)
+        return result
+
+
+    ###############
+    ## Execution ##
+    ###############
+
+    def collect(self):
+        '''
+        Executes the query (unless it has already been executed) and returns
+        the resulting table.
+        '''
+        if self._result is None:
+            column_ids, steps = self.plan()
+            parts = [self._execute(table, column_ids, steps) for table in self._source.tables(column_ids)]
+
+            if len(parts) == 1:
+                self._result = parts[0]
+            else:
+                self._result = Table()
+                self._result._append_tables(parts)
+
+        return self._result
+
+    def column(self, columnspec):
+        '''
+        See Table.column.
+        '''
+        return self.collect().column(self.resolve_column(columnspec))
+
+    def data_rows(self):
+        return self.collect().data_rows()
+
+    def records(self, record_class):
+        return self.collect().records(record_class)
+
+    def group_by(self, *columnspecs):
+        '''
+        See Table.group_by.
+        '''
+        indices = [self.resolve_column(columnspec) for columnspec in columnspecs]
+        return self.collect().group_by(*indices)
@@ -21,42 +21,292 @@ def _to_float(arg):
             return float(arg.replace(',', '.'))
     else:
         raise TypeError("Unhandled type: %s" % arg)
+
+# The key of the group of NaN values in group_by. NaN is not equal to itself,
+# but a dict finds the same object by identity.
+_nan = float("nan")
+
+def _group_key(row_key):
+    return tuple(_nan if isinstance(value, float) and value != value else value
+        for value in row_key)
+
+def _read_csv_file(file_name, kwargs):
+    # Reads a file for from_csv_files. This is a module-level function so it
+    # can be called in worker processes.
+    return Table.from_csv(file_name, columnar=True, **kwargs)
     
 # TODO the rows (including the header) shold be tuples so we know that they
 # can't change
     
 class Table:
+    '''
+    A table with an optional header row and data rows.
+
+    The data can be stored in one of two ways:
+      * Row storage (default): a list of rows, each row being a list of values.
+      * Columnar storage: one typed NumPy array per column, with a mask for
+        missing values (see columnar.Column). Typing, mapping, filtering, and
+        projecting columns are vectorized. Specify columnar=True when creating
+        or reading a table, or call to_columnar.
+    All methods work the same for both kinds of storage. In columnar storage,
+    _data_rows is None and the data is stored in _columns instead.
+
+    The tables returned by columns, filter, and group_by are views that share
+    the data of the original table: in columnar storage, they share the
+    columns or take rows lazily (see columnar.Column.take); in row storage,
+    they share the row objects and select columns by a list of column indices
+    (_projection), and the projected rows are only created when the data rows
+    are accessed. Shared rows are copied before they are changed in place.
+    '''
+
     ##################
     ## Construction ##
     ##################
      
-    def __init__(self, header_row=None, data_rows=[], column_names=[]):
+    def __init__(self, header_row=None, data_rows=None, column_names=None, columnar=False):
         self._header_row   = header_row
-        self._data_rows    = data_rows
-        self._column_names = column_names
+        self._data_rows    = data_rows    if data_rows    is not None else []
+        self._column_names = column_names if column_names is not None else []
+        self._columns      = None
+        self._rows_shared  = False # The row objects are shared with other tables
         
         self._file_name = None
 
+        # Hash indexes by column index: dict(value: list of row indices), or
+        # None if the index has not been built yet. See create_index.
+        self._indexes = {}
+
+        if columnar:
+            self._make_columnar()
+
+    @property
+    def _data_rows(self):
+        # The data rows in row storage. For a projection, the projected rows
+        # are created on first access.
+        if self._projection is not None:
+            projection = self._projection
+            self._rows = [[row[i] for i in projection] for row in self._rows]
+            self._projection = None
+            self._row_length = len(projection)
+            self._rows_shared = False
+        return self._rows
+
+    @_data_rows.setter
+    def _data_rows(self, rows):
+        self._rows       = rows
+        self._projection = None # Column indices into the rows, or None
+        self._row_length = None # The length of all rows if known to be equal
+
+    def _row_view(self, rows, header_row, column_names, projection):
+        # Returns a table with row storage that shares the specified row
+        # objects (which must be rows of this table)
+        self._rows_shared = True
+        table = Table(header_row, rows, column_names)
+        table._projection = projection
+        table._rows_shared = True
+        return table
+
+    def _own_rows(self):
+        # Copies the data rows if they are shared with other tables, so they can
+        # be changed in place
+        rows = self._data_rows
+        if self._rows_shared:
+            row_length = self._row_length
+            self._data_rows = [list(row) for row in rows]
+            self._row_length = row_length
+            self._rows_shared = False
+
+    @classmethod
+    def from_columns(cls, columns, header_row=None, column_names=None):
+        '''
+        Creates a table with columnar storage. columns is a list of
+        columnar.Column or of sequences of values (with None for missing
+        values).
+        '''
+        from protoplot.data.columnar import Column
+
+        table = cls(header_row, None, column_names)
+        table._data_rows = None
+        table._columns = [column if isinstance(column, Column) else Column.from_list(column)
+            for column in columns]
+        if not table._column_names:
+            table._column_names = [None] * len(table._columns)
+        return table
+
     @classmethod
-    def from_csv(cls, *args, **kwargs):
+    def from_csv(cls, *args, cache=None, **kwargs):
+        '''
+        Creates a table by calling read_csv. If cache is specified (a
+        cache.TableCache or a directory name), the table is loaded from the
+        cache if possible (see cache.TableCache.read).
+        '''
+        if cache is not None:
+            return cls._cache(cache).read(cls, "read_csv", *args, **kwargs)
+
         table = cls()
         table.read_csv(*args, **kwargs)
         return table
     
     @classmethod
-    def from_excel(cls, *args, **kwargs):
+    def from_excel(cls, *args, cache=None, **kwargs):
+        '''
+        Creates a table by calling read_excel. See from_csv for cache.
+        '''
+        if cache is not None:
+            return cls._cache(cache).read(cls, "read_excel", *args, **kwargs)
+
         table = cls()
         table.read_excel(*args, **kwargs)
         return table
 
+    @classmethod
+    def from_csv_files(cls, file_names, source_column="file", max_workers=None, **kwargs):
+        '''
+        Reads multiple CSV files with the same columns concurrently in a pool
+        of max_workers processes (default: one per CPU; 1 reads the files in
+        this process) and returns a tuple (table, errors).
+
+        kwargs are the arguments of from_csv (including column_setup and
+        cache) and are the same for all files. The table contains the data of
+        all files that were read successfully, in the order of file_names,
+        with columnar storage. If source_column is not None, a column with this
+        header and name is appended, containing the file name of each row.
+
+        A file that cannot be read (or has a different number of columns than
+        the first file) does not stop the other files from being read: errors
+        is a dict(file name: exception) for these files.
+        '''
+        file_names = list(file_names)
+        kwargs.pop("columnar", None)
+
+        # Submit all files, then collect the results in order
+        results = []
+        if max_workers == 1:
+            for file_name in file_names:
+                try:
+                    results.append((file_name, _read_csv_file(file_name, kwargs), None))
+                except Exception as e:
+                    results.append((file_name, None, e))
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers) as executor:
+                futures = [(file_name, executor.submit(_read_csv_file, file_name, kwargs))
+                    for file_name in file_names]
+                for file_name, future in futures:
+                    error = future.exception()
+                    results.append((file_name, future.result() if error is None else None, error))
+
+        tables = []
+        errors = {}
+        column_count = None
+        for file_name, table, error in results:
+            if error is None:
+                if column_count is None:
+                    column_count = table.column_count()
+                elif table.column_count() != column_count:
+                    error = NotImplementedError("%s has %d columns instead of %d" %
+                        (file_name, table.column_count(), column_count))
+            if error is not None:
+                errors[file_name] = error
+                continue
+
+            if source_column is not None:
+                table._add_source_column(source_column, file_name)
+            tables.append(table)
+
+        table = cls()
+        table._append_tables(tables)
+        return table, errors
+
+    def _add_source_column(self, name, file_name):
+        # Appends a column containing the file name to a table with columnar
+        # storage
+        import numpy as np
+        from protoplot.data.columnar import Column
+
+        self._columns.append(Column(np.full(self.data_row_count(), file_name)))
+        self._column_names.append(name)
+        if self._header_row is not None:
+            self._header_row = list(self._header_row) + [name]
+
+    @classmethod
+    def scan_csv(cls, file_name, **kwargs):
+        '''
+        Returns a lazy query (see query.Query) on a CSV file, which is read when
+        the result of the query is used. kwargs are the arguments of from_csv.
+        Only the columns needed by the query are read and set up.
+        '''
+        from protoplot.data.query import Query, _CsvSource
+        return Query(_CsvSource(file_name, kwargs))
+
+    @staticmethod
+    def _cache(cache):
+        from protoplot.data.cache import TableCache
+
+        if isinstance(cache, TableCache):
+            return cache
+        else:
+            return TableCache(cache)
+
+
+    #############
+    ## Storage ##
+    #############
+
+    def is_columnar(self):
+        return self._columns is not None
+
+    def to_columnar(self):
+        '''
+        Returns a table with the same data in columnar storage. If this table
+        already uses columnar storage, the columns are shared.
+        '''
+        return self._copy_with(columnar=True)
+
+    def to_rows(self):
+        '''
+        Returns a table with the same data in row storage.
+        '''
+        return self._copy_with(columnar=False)
+
+    def _copy_with(self, columnar):
+        if self.is_columnar():
+            table = Table.from_columns(self._columns, self._header_row, list(self._column_names))
+        else:
+            table = Table(self._header_row, [list(row) for row in self._data_rows], list(self._column_names))
+        table._file_name = self._file_name
+
+        if columnar:
+            table._make_columnar()
+        else:
+            table._make_rows()
+        return table
+
+    def _make_columnar(self):
+        if not self.is_columnar():
+            from protoplot.data.columnar import columns_from_rows
+            column_count = self.column_count() if self._header_row is not None or self._data_rows else 0
+            self._columns = columns_from_rows(self._data_rows, column_count)
+            self._data_rows = None
+
+    def _make_rows(self):
+        if self.is_columnar():
+            from protoplot.data.columnar import rows_from_columns
+            self._data_rows = list(rows_from_columns(self._columns))
+            self._columns = None
+
 
     #########
     ## I/O ##
     #########
 
-    def read_csv(self, file_name, header=True, open_args={}, csv_args={}, **kwargs):
-        import csv
- 
+    @staticmethod
+    def _csv_args(open_args, csv_args, kwargs):
+        # Returns copies of open_args and csv_args, with the respective values
+        # moved from kwargs
+        open_args = dict(open_args)
+        csv_args  = dict(csv_args)
+
         _move_value(kwargs, open_args, "newline")
         _move_value(kwargs, open_args, "encoding")
  
@@ -68,9 +318,47 @@ class Table:
         _move_value(kwargs, csv_args, "quotechar")
         _move_value(kwargs, csv_args, "quoting")
         _move_value(kwargs, csv_args, "skipinitialspace")
+
+        return open_args, csv_args
+
+    def read_csv(self, file_name, header=True, open_args={}, csv_args={}, columnar=False,
+            chunk_size=None, column_setup=None, usecols=None, **kwargs):
+        '''
+        Reads the rows of a CSV file into the table.
+
+        column_setup is a list of dicts of setup_column arguments, e. g.
+            [{"index": 0, "header": "Time", "name": "time", "datatype": float}]
+        which are applied after reading.
+
+        If usecols (a list of column indices of the file) is specified, only
+        these columns are read, in the specified order. The indices in
+        column_setup still refer to the columns of the file; the setup of
+        columns that are not read is ignored, so they are never converted.
+
+        If chunk_size is specified, the file is read in chunks of up to
+        chunk_size rows (see iter_csv), and the table uses columnar storage.
+        Each chunk is typed by column_setup before the next chunk is read, so
+        the memory for the unparsed rows is bounded by the chunk size.
+        '''
+        if chunk_size is not None:
+            chunks = Table.iter_csv(file_name, chunk_size, header, column_setup, True,
+                open_args, csv_args, usecols, **kwargs)
+            self._append_tables(chunks)
+            self._file_name = file_name
+            return
+
+        import csv
+
+        open_args, csv_args = self._csv_args(open_args, csv_args, kwargs)
+
+        # Read into row storage
+        columnar = columnar or self.is_columnar()
+        self._make_rows()
+        self._invalidate_indexes()
+        self._data_rows = list(self._data_rows)
  
         with open(file_name, 'r', **open_args) as csvfile:
-            csv_reader = csv.reader(csvfile, **csv_args)
+            csv_reader = self._select_columns(csv.reader(csvfile, **csv_args), usecols)
             for row in csv_reader:
                 if header and self._header_row is None:
                     self._header_row = row
@@ -82,51 +370,242 @@ class Table:
         
         self._column_names = [None] * self.column_count()
         self._file_name = file_name
+
+        if columnar:
+            self._make_columnar()
+
+        self._setup_columns(self._selected_setup(column_setup, usecols))
+
+    @classmethod
+    def iter_csv(cls, file_name, chunk_size, header=True, column_setup=None, columnar=False,
+            open_args={}, csv_args={}, usecols=None, **kwargs):
+        '''
+        Reads a CSV file in chunks and yields a table for each chunk.
+
+        Each table has the header row of the file (if header is True) and up to
+        chunk_size data rows, and is set up by column_setup (see read_csv for
+        column_setup and usecols). Row lengths are validated while reading.
+        '''
+        import csv
+        import itertools
+
+        open_args, csv_args = cls._csv_args(open_args, csv_args, kwargs)
+        column_setup = cls._selected_setup(column_setup, usecols)
+
+        with open(file_name, 'r', **open_args) as csvfile:
+            csv_reader = cls._select_columns(csv.reader(csvfile, **csv_args), usecols)
+
+            header_row = next(csv_reader, None) if header else None
+            column_count = len(header_row) if header_row is not None else None
+
+            # Yield at least one (possibly empty) table if there is a header
+            first = header_row is not None
+
+            while True:
+                rows = list(itertools.islice(csv_reader, chunk_size))
+                if not rows and not first:
+                    break
+                first = False
+
+                if column_count is None:
+                    column_count = len(rows[0])
+                if any(len(row) != column_count for row in rows):
+                    raise NotImplementedError("Rows have different lengths")
+
+                table = cls(header_row, rows, [None] * column_count, columnar)
+                table._file_name = file_name
+                table._setup_columns(column_setup)
+                yield table
+
+    @staticmethod
+    def _select_columns(rows, usecols):
+        # Returns an iterator over the rows with only the columns in usecols
+        # (or all columns if usecols is None). The row lengths are validated
+        # before selecting the columns.
+        if usecols is None:
+            return rows
+
+        def select(rows):
+            column_count = None
+            for row in rows:
+                if column_count is None:
+                    column_count = len(row)
+                elif len(row) != column_count:
+                    raise NotImplementedError("Rows have different lengths")
+                yield [row[i] for i in usecols]
+
+        return select(rows)
+
+    @staticmethod
+    def _selected_setup(column_setup, usecols):
+        # Returns column_setup for the columns in usecols (or all columns if
+        # usecols is None), with the indices translated
+        if usecols is None or column_setup is None:
+            return column_setup
+
+        return [dict(setup, index=usecols.index(setup["index"]))
+            for setup in column_setup if setup["index"] in usecols]
+
+    def _append_tables(self, tables):
+        # Appends the data of the tables, which must have the same columns, to
+        # this table, which will use columnar storage. The header row is taken
+        # from the first table if this table does not have one yet.
+        from protoplot.data.columnar import concatenate
+
+        self._make_columnar()
+        self._invalidate_indexes()
+        parts = [self._columns] if self.data_row_count() > 0 else []
+
+        for table in tables:
+            if self._header_row is None:
+                self._header_row = table._header_row
+            if not any(self._column_names):
+                self._column_names = list(table._column_names)
+
+            table._make_columnar()
+            if parts and len(table._columns) != len(parts[0]):
+                raise NotImplementedError("Rows have different lengths")
+            parts.append(table._columns)
+
+        if parts:
+            self._columns = concatenate(parts)
+        if len(self._column_names) != len(self._columns):
+            self._column_names = [None] * len(self._columns)
+
+    def _setup_columns(self, column_setup):
+        for setup in column_setup or []:
+            self.setup_column(**setup)
   
-    def read_excel(self, file_name, sheet_name, header=True, open_workbook_options={}):
+    def read_excel(self, file_name, sheet_name, header=True, open_workbook_options={}, columnar=False,
+            usecols=None, row_range=None, column_setup=None):
+        '''
+        Reads the rows of a sheet of an Excel file into the table.
+
+        Only the specified sheet is loaded from the file. If usecols (a list of
+        column indices of the sheet) is specified, only these columns are read.
+        If row_range is specified as (start, stop), only the data rows from
+        start (inclusive) to stop (exclusive; None for the end of the sheet)
+        are read, counted without the header row. column_setup is applied as
+        in read_csv.
+
+        The values are read column by column and, for columnar storage, stored
+        directly in the columns without creating rows.
+        '''
         import xlrd
-        
-        workbook = xlrd.open_workbook(file_name, **open_workbook_options)
-        sheet = workbook.sheet_by_name(sheet_name)
-  
-        for i in range(sheet.nrows):
-            row = sheet.row_values(i)
-            if header and self._header_row is None:
-                self._header_row = row
-            else:
-                self._data_rows.append(row)
 
-        if not self.all_rows_equal_length():
-            raise NotImplementedError("Rows have different lengths")
+        columnar = columnar or self.is_columnar()
+        self._make_rows()
+        self._invalidate_indexes()
+        self._data_rows = list(self._data_rows)
 
-        self._column_names = [None] * self.column_count()
+        # Load only the requested sheet
+        workbook = xlrd.open_workbook(file_name, on_demand=True, **open_workbook_options)
+        try:
+            sheet = workbook.sheet_by_name(sheet_name)
+            if usecols is None:
+                usecols = list(range(sheet.ncols))
+
+            first_row = 0
+            if header and self._header_row is None and sheet.nrows > 0:
+                self._header_row = [sheet.cell_value(0, column) for column in usecols]
+                first_row = 1
+
+            start, stop = first_row, sheet.nrows
+            if row_range is not None:
+                start = min(first_row + row_range[0], sheet.nrows)
+                if row_range[1] is not None:
+                    stop = min(first_row + row_range[1], sheet.nrows)
+
+            values = [sheet.col_values(column, start, max(start, stop)) for column in usecols]
+        finally:
+            workbook.release_resources()
+
+        if columnar and not self._data_rows:
+            from protoplot.data.columnar import Column
+            self._columns = [Column.from_list(column_values) for column_values in values]
+            self._data_rows = None
+        else:
+            self._data_rows.extend(map(list, zip(*values)))
+            if not self.all_rows_equal_length():
+                raise NotImplementedError("Rows have different lengths")
+
+        self._column_names = [None] * len(usecols)
         self._file_name = file_name
 
+        if columnar:
+            self._make_columnar()
+
+        self._setup_columns(self._selected_setup(column_setup, usecols))
+
 
     #####################
     ## Table structure ##
     #####################
 
     def column_count(self):
-        row_lengths = (len(row) for row in self.all_rows())
-        return max(row_lengths)
+        if self.is_columnar():
+            return len(self._columns)
+        elif self._projection is not None:
+            return len(self._projection)
+
+        elif self.all_rows_equal_length():
+            # A table without any rows has no columns
+            return self._row_length if self._row_length is not None else 0
+
+        return max(map(len, self.all_rows()))
 
     def data_row_count(self):
-        return len(self._data_rows)
+        if self.is_columnar():
+            from protoplot.data.columnar import row_count
+            return row_count(self._columns)
+
+        return len(self._rows)
+
+    def data_rows(self):
+        '''
+        Returns the data rows as a list of lists. For columnar storage, the
+        rows are created from the columns.
+        '''
+        if self.is_columnar():
+            from protoplot.data.columnar import rows_from_columns
+            return list(rows_from_columns(self._columns))
+        else:
+            return self._data_rows
 
     def all_rows(self):
+        '''
+        Returns an iterator over the header row (if any) and the data rows.
+        '''
+        import itertools
+
+        if self.is_columnar():
+            from protoplot.data.columnar import rows_from_columns
+            data_rows = rows_from_columns(self._columns)
+        else:
+            data_rows = self._data_rows
+
         if self._header_row is None:
-            return self._data_rows
+            return iter(data_rows)
         else:
-            return [self._header_row] + self._data_rows
+            return itertools.chain([self._header_row], data_rows)
     
     def all_rows_equal_length(self):
-        all_row_lengths = [len(row) for row in self.all_rows()]
-        
-        if len(all_row_lengths) == 0:
+        '''
+        Returns True if all rows, including the header row, have the same
+        length. For row storage, the result is cached as _row_length until the
+        rows are replaced; the data rows must not be changed in length in
+        place.
+        '''
+        if self.is_columnar():
+            return self._header_row is None or len(self._header_row) == len(self._columns)
+        elif self._projection is not None or self._row_length is not None:
             return True
-        else:
-            return all(l == all_row_lengths[0] for l in all_row_lengths)
+
+        row_lengths = set(map(len, self.all_rows()))
+        if len(row_lengths) == 1:
+            self._row_length = row_lengths.pop()
+            return True
+        return len(row_lengths) == 0
 
     def setup_column(self, index, header=None, name=None, datatype=None, mapping=None):
         '''
@@ -147,14 +626,24 @@ class Table:
         if name is not None:
             self._column_names[index] = name
 
-        if datatype == float:
-            transform = _to_float
+        if datatype is not None:
+            self._invalidate_indexes([index])
+
+        if datatype is None:
+            pass
+        elif self.is_columnar():
+            self._columns[index] = self._columns[index].astype(datatype)
+        elif datatype == float:
+            # Parse the whole column at once
+            from protoplot.data.columnar import parse_floats
+            self._own_rows()
+            values, mask = parse_floats([row[index] for row in self._data_rows])
+            for row, value, missing in zip(self._data_rows, values.tolist(), mask.tolist()):
+                row[index] = None if missing else value
         else:
-            transform = datatype 
-            
-        if transform is not None:
+            self._own_rows()
             for row in self._data_rows:
-                row[index] = transform(row[index])
+                row[index] = datatype(row[index])
 
         if mapping is not None:
             self.map_column(index, mapping, skip_none = True)
@@ -189,6 +678,13 @@ class Table:
     ## Table data ##
     ################
 
+    def lazy(self):
+        '''
+        Returns a lazy query (see query.Query) on this table.
+        '''
+        from protoplot.data.query import Query, _TableSource
+        return Query(_TableSource(self))
+
     def columns(self, columnspecs):
         '''
         Columns is any sequence of anything that resolve_column accepts.
@@ -198,13 +694,22 @@ class Table:
         # Resolve the columns and construct the new header and data.
         indices = self.resolve_columns(columnspecs)
         
-        map_fn = lambda row: [row[i] for i in indices]
-        new_header       = map_fn(self._header_row)
-        new_data         = list(map(map_fn, self._data_rows))
-        new_column_names = map_fn(self._header_row)
+        if self._header_row is not None:
+            new_header       = [self._header_row[i] for i in indices]
+            new_column_names = list(new_header)
+        else:
+            new_header       = None
+            new_column_names = [self._column_names[i] for i in indices]
+
+        # For columnar storage, the columns are shared
+        if self.is_columnar():
+            new_columns = [self._columns[i] for i in indices]
+            return Table.from_columns(new_columns, new_header, new_column_names)
         
-        # Create the new table
-        return Table(new_header, new_data, new_column_names)
+        # For row storage, the rows are shared and projected on access
+        if self._projection is not None:
+            indices = [self._projection[i] for i in indices]
+        return self._row_view(self._rows, new_header, new_column_names, indices)
 
 
     def filter(self, conditions):
@@ -215,25 +720,57 @@ class Table:
             columnspec is anything supported by resolve_column
             value is a string
           - [(columnspec, value), ...] (list form)
+          - an expression over column names, e. g. "temp > 40 and mode == 'fast'"
+            (see expression.Expression), evaluated vectorized over whole
+            columns; much faster than a function
         '''
         # TODO allow regular expressions or functions for value
         # TODO allow kwargs (with column names only)
         # TODO allow auto functions (with automatic parameter name matching)
-        # TODO allow eval'd string expressions
+
+        if isinstance(conditions, str):
+            from protoplot.data.expression import compile_expression
+            expression = compile_expression(conditions)
+            columns = {name: self.resolve_column(name) for name in expression.names}
+            return self._filter_expression(expression, columns)
 
         # A dictionary is converted to list form
         if isinstance(conditions, dict):
             conditions = list(conditions.items())
 
-        # A function is called with the values of the row as arguments         
-        if hasattr(conditions, '__call__'):
-            def row_matches(row):
-                return conditions(*row)
-        elif isinstance(conditions, list):
+        if isinstance(conditions, list):
             # Resolve the columns
             conditions=[(self.resolve_column(columnspec), value) for
                 columnspec, value in conditions]
-     
+
+            # Use the indexes of indexed columns, if any, and check the
+            # remaining conditions for the matching rows only.
+            indexed = self._indexed_rows(conditions)
+            if indexed is not None:
+                rows, conditions = indexed
+                table = self._take_rows(rows)
+                if conditions:
+                    table = table.filter(conditions)
+                return table
+
+        if self.is_columnar():
+            return self._filter_columnar(conditions)
+
+        # The conditions are checked on the shared rows. For a projection, the
+        # column indices are translated.
+        projection = self._projection
+
+        # A function is called with the values of the row as arguments         
+        if hasattr(conditions, '__call__'):
+            if projection is None:
+                def row_matches(row):
+                    return conditions(*row)
+            else:
+                def row_matches(row):
+                    return conditions(*[row[i] for i in projection])
+        elif isinstance(conditions, list):
+            if projection is not None:
+                conditions = [(projection[c], value) for c, value in conditions]
             def row_matches(row):
                 for column_index, value in conditions:
                     if row[column_index]!=value:
@@ -243,16 +780,200 @@ class Table:
             raise ValueError("Unsupported conditions value: %s" % repr(conditions))
 
         # Create the resulting table. The header does not change.
-        new_header       = list(self._header_row)
-        new_data         = list(filter(row_matches, self._data_rows))
+        new_header       = list(self._header_row) if self._header_row is not None else None
+        new_data         = list(filter(row_matches, self._rows))
         new_column_names = list(self._column_names)
-        return Table(new_header, new_data, new_column_names)
+        return self._row_view(new_data, new_header, new_column_names, projection)
 
-    def records(self, record_class):
-        return [record_class(*row) for row in self._data_rows]
+    def _filter_columnar(self, conditions):
+        from protoplot.data.columnar import select_equal, select_function
 
-    def map_column(self, columnspec, function, skip_none = True):
+        if hasattr(conditions, '__call__'):
+            selection = select_function(self._columns, conditions)
+        elif isinstance(conditions, list):
+            selection = select_equal(self._columns, conditions)
+        else:
+            raise ValueError("Unsupported conditions value: %s" % repr(conditions))
+
+        new_header       = list(self._header_row) if self._header_row is not None else None
+        new_columns      = [column.take(selection) for column in self._columns]
+        new_column_names = list(self._column_names)
+        return Table.from_columns(new_columns, new_header, new_column_names)
+
+    def _filter_expression(self, expression, columns):
+        # Filters by an expression.Expression. columns is a dict(name: column
+        # index) for the names in the expression.
+        import numpy as np
+        columns = {name: self._column_object(index) for name, index in columns.items()}
+        selection = expression.evaluate(columns, self.data_row_count())
+        return self._take_rows(np.flatnonzero(selection).tolist())
+
+    def _column_object(self, column_index):
+        # Returns a column as a columnar.Column
+        if self.is_columnar():
+            return self._columns[column_index]
+
+        from protoplot.data.columnar import Column
+        return Column.from_list(self.column(column_index))
+
+    def group_by(self, *columnspecs):
+        '''
+        Partitions the data rows by the values of the specified columns (any
+        number of anything that resolve_column accepts) in a single pass.
+
+        Returns a dict(key: table), in order of first appearance of the key.
+        The key is the column value if one column is specified, or a tuple of
+        column values otherwise. All NaN values are in the same group, with a
+        NaN key (use math.isnan to find it, as NaN is not equal to any value,
+        including other NaN objects). The tables share the data of this table: with
+        row storage, they contain the same row objects; with columnar storage,
+        their columns are views (see columnar.partition).
+
+        The tables can be used as series data, e. g.:
+            for mode, group in table.group_by("mode").items():
+                plot.series.add("time", "temp", data=group, label=mode)
+        '''
+        indices = self.resolve_columns(columnspecs)
+
+        if self.is_columnar():
+            key_columns = [self._columns[index].to_list() for index in indices]
+            row_keys = zip(*key_columns)
+        else:
+            source = [self._source_column(index) for index in indices]
+            row_keys = ([row[index] for index in source] for row in self._rows)
+
+        # Assign a group number to each row
+        groups = {}
+        group_ids = []
+        for row_key in row_keys:
+            group_ids.append(groups.setdefault(_group_key(row_key), len(groups)))
+
+        new_header       = list(self._header_row) if self._header_row is not None else None
+        keys = [key[0] if len(indices) == 1 else key for key in groups]
+
+        if self.is_columnar():
+            from protoplot.data.columnar import partition
+            parts = partition(self._columns, group_ids, len(groups))
+            tables = [Table.from_columns(columns, new_header, list(self._column_names))
+                for columns in parts]
+        else:
+            parts = [[] for _ in groups]
+            for row, group_id in zip(self._rows, group_ids):
+                parts[group_id].append(row)
+            tables = [self._row_view(rows, new_header, list(self._column_names), self._projection)
+                for rows in parts]
+
+        return dict(zip(keys, tables))
+
+    def column(self, columnspec):
+        '''
+        Returns the values of a column: a list for row storage, and a NumPy
+        array for columnar storage, with NaN for missing values in float
+        columns (columns with missing values of other types are returned as a
+        list with None).
+        '''
         column_index = self.resolve_column(columnspec)
+
+        if self.is_columnar():
+            column = self._columns[column_index]
+            if column.values.dtype.kind == 'f' or not column.mask.any():
+                return column.values
+            else:
+                return column.to_list()
+        else:
+            source = self._source_column(column_index)
+            return [row[source] for row in self._rows]
+
+    def _source_column(self, column_index):
+        # Returns the index of a column in the (possibly shared) rows
+        if self._projection is not None:
+            return self._projection[column_index]
+        return column_index
+
+    def _take_rows(self, rows):
+        # Returns a table with the data rows with the specified indices
+        new_header       = list(self._header_row) if self._header_row is not None else None
+        new_column_names = list(self._column_names)
+
+        if self.is_columnar():
+            import numpy as np
+            rows = np.asarray(rows, dtype=np.intp)
+            new_columns = [column.take(rows) for column in self._columns]
+            return Table.from_columns(new_columns, new_header, new_column_names)
+        else:
+            new_data = [self._rows[row] for row in rows]
+            return self._row_view(new_data, new_header, new_column_names, self._projection)
+
+    def records(self, record_class=None):
+        '''
+        Returns a list with a record_class instance, created with the values of
+        the row as arguments, for each data row. If record_class is None,
+        returns a record array instead (see to_records), which does not create
+        an object per row.
+        '''
+        if record_class is None:
+            return self.to_records()
+
+        return [record_class(*row) for row in self.data_rows()]
+
+    def to_records(self):
+        '''
+        Returns the data as a NumPy record array with one field per column, so
+        the values can be accessed as columns (records.temp, records["temp"])
+        or as rows (records[0].temp) without creating an object per row. The
+        record array can be used as series data.
+
+        The field names are the column names; for columns without a name, the
+        header is used, or "f<index>" if there is no header. Missing values are
+        NaN in float columns; other columns with missing values are stored as
+        objects with None.
+        '''
+        import numpy as np
+
+        arrays = []
+        for index in range(self.column_count()):
+            column = self._column_object(index)
+            if column.values.dtype.kind == 'f' or not column.mask.any():
+                arrays.append(column.values)
+            else:
+                values = column.values.astype(object)
+                values[column.mask] = None
+                arrays.append(values)
+
+        names = []
+        for index in range(len(arrays)):
+            name = self._column_names[index]
+            if name is None and self._header_row is not None:
+                name = str(self._header_row[index])
+            if name is None or name in names:
+                name = "f%d" % index
+            names.append(name)
+
+        return np.rec.fromarrays(arrays, names=names)
+
+    def map_column(self, columnspec, function, skip_none = True, vectorized = False):
+        '''
+        Applies the function to each value of the column. If vectorized is True,
+        the function is called once with a NumPy array of all non-missing values
+        instead (see columnar.Column.map).
+        '''
+        column_index = self.resolve_column(columnspec)
+        self._invalidate_indexes([column_index])
+
+        if self.is_columnar():
+            column = self._columns[column_index]
+            self._columns[column_index] = column.map(function, skip_none, vectorized)
+            return
+
+        self._own_rows()
+
+        if vectorized:
+            from protoplot.data.columnar import Column
+            column = Column.from_list([row[column_index] for row in self._data_rows])
+            values = column.map(function, skip_none, vectorized).to_list()
+            for row, value in zip(self._data_rows, values):
+                row[column_index] = value
+            return
         
         for row in self._data_rows:
             value = row[column_index]
@@ -260,38 +981,194 @@ class Table:
                 row[column_index] = function(row[column_index])
 
 
+    #############
+    ## Indexes ##
+    #############
+
+    def create_index(self, columnspec):
+        '''
+        Creates a hash index for a column, which filter will use for equality
+        conditions on this column, so repeated filtering takes time proportional
+        to the number of matching rows rather than the number of rows.
+
+        The index is built on first use and rebuilt after the column has been
+        changed by setup_column or map_column. It is not copied to the tables
+        created by filter or columns.
+        '''
+        column_index = self.resolve_column(columnspec)
+        if column_index not in self._indexes:
+            self._indexes[column_index] = None
+
+    def drop_index(self, columnspec):
+        column_index = self.resolve_column(columnspec)
+        self._indexes.pop(column_index, None)
+
+    def _invalidate_indexes(self, column_indices = None):
+        # Marks the indexes of the specified columns (default: all columns) to
+        # be rebuilt on next use
+        for column_index in self._indexes:
+            if column_indices is None or column_index in column_indices:
+                self._indexes[column_index] = None
+
+    def _index(self, column_index):
+        # Returns the index of the column, building it if necessary. Raises
+        # TypeError if the column contains unhashable values.
+        index = self._indexes[column_index]
+
+        if index is None:
+            if self.is_columnar():
+                values = self._columns[column_index].to_list()
+            else:
+                values = self.column(column_index)
+
+            index = {}
+            for row, value in enumerate(values):
+                index.setdefault(value, []).append(row)
+            self._indexes[column_index] = index
+
+        return index
+
+    def _indexed_rows(self, conditions):
+        # For resolved list-form conditions, returns a tuple (row indices,
+        # remaining conditions) if there are conditions on indexed columns, or
+        # None otherwise. The row indices are sorted and match all conditions on
+        # indexed columns.
+        indexed   = [(c, v) for c, v in conditions if c in self._indexes]
+        remaining = [(c, v) for c, v in conditions if c not in self._indexes]
+        if not indexed:
+            return None
+
+        try:
+            matches = [self._index(column_index).get(value, []) for column_index, value in indexed]
+        except TypeError:
+            # Unhashable values
+            return None
+
+        # The rows of a single index are already sorted
+        if len(matches) == 1:
+            return list(matches[0]), remaining
+
+        # Start with the smallest set of matches
+        matches.sort(key=len)
+        rows = set(matches[0])
+        for other in matches[1:]:
+            rows.intersection_update(other)
+
+        return sorted(rows), remaining
+
+
     ################
     ## Conversion ##
     ################
 
-    def format(self, column_separator="|", row_separator="\n", hlines=None):
-        rows = self.all_rows()
- 
+    def format(self, column_separator="|", row_separator="\n", hlines=None, file=None,
+            head=None, tail=None, chunk_size=1000):
+        '''
+        Formats the table with fixed-width columns.
+
+        If file (a file-like object) is specified, the output is written to it
+        in chunks of chunk_size rows and None is returned; otherwise, the
+        output is returned as a string.
+
+        If head and/or tail are specified, only the first head and the last
+        tail data rows are formatted, with a row of "..." in between if rows
+        are omitted.
+        '''
+        import io
+        import itertools
+
         if hlines is None:
             hlines = self._header_row is not None
- 
-        def column_width(index):
-            lengths=(len(str(row[index])) for row in rows)
-            return max(lengths)
-         
-        column_widths=[column_width(index) for index in range(self.column_count())]
- 
-        # Format the header and data, row by row
-        def format_row(row):
-            formatted_values=[str(row[column_index]).ljust(column_widths[column_index]) for column_index in range(len(column_widths))]
-            return column_separator.join(formatted_values)
-            pass
-         
-        formatted_rows=[format_row(row) for row in rows]
-         
-        if hlines:
+
+        # Select the data rows to format
+        row_count = self.data_row_count()
+        if head is None and tail is None or (head or 0) + (tail or 0) >= row_count:
+            selected = None
+            omitted = False
+        else:
+            selected = list(range(head or 0)) + list(range(row_count - (tail or 0), row_count))
+            omitted = True
+
+        table = self if selected is None else self._take_rows(selected)
+        column_count = self.column_count()
+        if self._header_row is not None:
+            header = [str(value) for value in self._header_row]
+        else:
+            header = None
+
+        # Determine the column widths in a first pass. Like the output, the
+        # cell strings are created in chunks, so only one chunk of strings is
+        # kept in memory at a time.
+        column_widths = [0] * column_count
+        for columns in table._string_chunks(chunk_size):
+            for index, strings in enumerate(columns):
+                column_widths[index] = max(column_widths[index], max(map(len, strings), default=0))
+        if header is not None:
+            column_widths = [max(width, len(string)) for width, string in zip(column_widths, header)]
+        if omitted:
+            column_widths = [max(width, 3) for width in column_widths]
+
+        def format_row(strings):
+            return column_separator.join(string.ljust(width) for string, width in zip(strings, column_widths))
+
+        # Generate the lines: header, data rows, and horizontal lines. The
+        # data values are padded column by column, one chunk at a time.
+        def data_lines():
+            for columns in table._string_chunks(chunk_size):
+                padded = [[string.ljust(width) for string in strings]
+                    for strings, width in zip(columns, column_widths)]
+                yield from map(column_separator.join, zip(*padded))
+
+        def lines():
+            if header is not None:
+                yield format_row(header)
+
+            rows = data_lines()
+            if omitted:
+                yield from itertools.islice(rows, head or 0)
+                yield format_row(["..."] * column_count)
+            yield from rows
+
+        def lines_with_hlines():
             total_width = sum(column_widths) + (len(column_widths)-1)*len(column_separator)
             hline = "-" * total_width
-            formatted_rows.insert(0, hline)
-            formatted_rows.insert(2, hline)
-            formatted_rows.append(hline)
-         
-        return row_separator.join(formatted_rows)
+            yield hline
+            for index, line in enumerate(lines()):
+                yield line
+                if index == 0:
+                    yield hline
+            yield hline
+
+        output = file if file is not None else io.StringIO()
+        all_lines = lines_with_hlines() if hlines else lines()
+        first = True
+        while True:
+            chunk = list(itertools.islice(all_lines, chunk_size))
+            if not chunk:
+                break
+            if not first:
+                output.write(row_separator)
+            output.write(row_separator.join(chunk))
+            first = False
+
+        if file is None:
+            return output.getvalue()
+ 
+    def _string_chunks(self, chunk_size):
+        # Yields the data cells converted to strings, as a list of columns for
+        # each chunk of chunk_size rows
+        column_count = self.column_count()
+        row_count = self.data_row_count()
+        for start in range(0, row_count, chunk_size):
+            end = min(start + chunk_size, row_count)
+            if self.is_columnar():
+                import numpy as np
+                rows = np.arange(start, end)
+                yield [list(map(str, column.take(rows).to_list())) for column in self._columns]
+            else:
+                rows = self._rows[start:end]
+                yield [[str(row[source]) for row in rows]
+                    for source in map(self._source_column, range(column_count))]
  
     def __str__(self):
         if self._header_row is not None:
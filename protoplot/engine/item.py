@@ -13,6 +13,21 @@ from protoplot.engine.item_container import ItemContainer
 #                            Series.all.set(...)
 # For testability, a resolved option should store probably store a complete list
 # of values in order of priority.
+
+# The inherited options of an item without parent. Must not be modified.
+_noInherited = {}
+
+class _ResolvedOptions:
+    '''
+    The cached result of resolving the options of an item, along with the
+    inputs it was resolved from.
+    '''
+    def __init__(self, versions, inherited, own_options, sub_results, result):
+        self.versions    = versions     # Versions of own and template options
+        self.inherited   = inherited    # Inherited options (compared by identity)
+        self.own_options = own_options  # Resolved options of the item
+        self.sub_results = sub_results  # Results of children and container items
+        self.result      = result       # Resolved options of the subtree
  
 class Item(metaclass=ItemMetaclass):
     '''
@@ -37,10 +52,11 @@ class Item(metaclass=ItemMetaclass):
     Item subclasses should call the Item constructor with all *args and **kwargs
     and define a register_options method to register the options, like so:
         self.options.register("color", False, "black")
-    Note that the Item constructor, which runs before the Item subclass
-    constructor, sets the initial options. The options must already be
-    registered at this point, so this cannot be done by the Item subclass
-    constructor. 
+    register_options is a class-level hook: it is called only once per class,
+    when the first instance is created, and the registered options are compiled
+    into an options schema which is shared by all instances of the class (see
+    ItemMetaclass.options_schema). It must therefore not access anything but
+    self.options. An instance only stores the option values actually set.
     '''
     
     def __init__(self, **kwargs):
@@ -56,19 +72,30 @@ class Item(metaclass=ItemMetaclass):
         else:
             self.tags = []
 
-        # Create the instance-level options and initialize them from the
-        # remaining kwargs.
-        #self.options = OptionsContainer(self.__class__.options)
-        self.options = OptionsContainer()
-        # Subclasses must override this method. We cannot do this in the
-        # subclass constructor because it must be done before setting the kwargs
-        # as options.
-        self.register_options()
+        # Create the instance-level options, sharing the options schema of the
+        # class, and initialize them from the remaining kwargs.
+        self.options = OptionsContainer(type(self).options_schema())
         self.options.set(**kwargs)
 
         # Add the instance-level set method. See __set for an explanation. 
         self.set = self.__set
 
+        # The cached resolved options, see resolve_options
+        self.__resolved = None
+
+    def __getstate__(self):
+        # The instance-level set method (a bound method of a private method)
+        # can't be pickled, and the cached resolved options are not needed in
+        # a copy. Pickling is used to render plots in worker processes.
+        state = dict(self.__dict__)
+        del state['set']
+        state['_Item__resolved'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.set = self.__set
+
 
     ##############
     ## Children ##
@@ -90,6 +117,8 @@ class Item(metaclass=ItemMetaclass):
     #############
 
     def register_options(self):
+        # Subclasses must override this method. It is called once per class
+        # (not per instance) by ItemMetaclass.options_schema.
         raise NotImplementedError(
             "Item subclasses must implement the register_options method")
 
@@ -106,6 +135,20 @@ class Item(metaclass=ItemMetaclass):
         self.options.set(**kwargs)
 
     def resolve_options(self, templates = None, inherited = None, indent="", verbose = False):
+        '''
+        Returns a dict(item: dict(name: value)) with the resolved options of
+        this item and of all items below it.
+
+        Results are cached per item and resolving is incremental: the options of
+        an item are only resolved again if its own options, the options of one
+        of its templates, or its inherited options have changed (see
+        OptionsContainer.version), and the result of a subtree is only rebuilt
+        if something in the subtree has changed.
+        '''
+        return dict(self._resolve_options(templates, inherited, indent, verbose))
+
+    def _resolve_options(self, templates, inherited, indent, verbose):
+        # Returns the cached result dict if possible; it must not be modified.
         def p(*args, **kwargs):
             if verbose:
                 print(indent, *args, **kwargs)
@@ -120,14 +163,24 @@ class Item(metaclass=ItemMetaclass):
         templates = templates + type(self).matching_templates(self.tags)
         template_option_containers = [t.options for t in templates]
 
-        inherited = inherited or dict()
-
-        # Determine the options for self
-        own_options = self.options.resolve(template_option_containers, inherited)
+        inherited = inherited or _noInherited
+
+        # Determine the options for self, unless neither our own options nor
+        # the template options nor the inherited options have changed. The
+        # inherited options are the resolved options of the parent, which are
+        # the same object as long as they are reused.
+        cached = self.__resolved
+        versions = tuple(oc.version for oc in [self.options] + template_option_containers)
+        if cached is not None and cached.versions == versions and cached.inherited is inherited:
+            p("* Reusing own options")
+            own_options = cached.own_options
+        else:
+            own_options = self.options.resolve(template_option_containers, inherited)
         #print(indent+"* Own options: {}".format(own_options))
 
+        sub_results = []
+
         # Determine the options for direct children (recursively)
-        children_options = {}
         for name, child in self.children():
             p("* Child", name)
             child_templates = [
@@ -135,13 +188,9 @@ class Item(metaclass=ItemMetaclass):
                 for template in templates
             ]
 
-            child_inherited = own_options
-
-            child_options = child.resolve_options(child_templates, child_inherited, indent = indent+"  ", verbose = verbose)
-            children_options.update(child_options)
+            sub_results.append(child._resolve_options(child_templates, own_options, indent+"  ", verbose))
 
         # Determine the options for children in containers (recursively)
-        containers_options = {}
         for name, container in self.containers():
             p("* Container", name, container)
             template_containers = [
@@ -153,16 +202,23 @@ class Item(metaclass=ItemMetaclass):
             for child in container.items:
                 # Select the matching templates for the child
                 child_templates = []
-                for container in template_containers:
-                    child_templates += container.matching_templates(child.tags)
-
-                child_inherited = own_options
-
-                child_options = child.resolve_options(child_templates, own_options, indent = indent+"  ", verbose = verbose)
-                containers_options.update(child_options)
+                for template_container in template_containers:
+                    child_templates += template_container.matching_templates(child.tags)
+
+                sub_results.append(child._resolve_options(child_templates, own_options, indent+"  ", verbose))
+
+        # If our own options and the results of all children and container
+        # items (including the set of children and items) are unchanged, the
+        # result is unchanged as well.
+        if (cached is not None and cached.own_options is own_options
+                and len(cached.sub_results) == len(sub_results)
+                and all(a is b for a, b in zip(cached.sub_results, sub_results))):
+            result = cached.result
+        else:
+            result = {}
+            result[self] = own_options
+            for sub_result in sub_results:
+                result.update(sub_result)
 
-        result = {}
-        result[self] = own_options
-        result.update(children_options)
-        result.update(containers_options)
+        self.__resolved = _ResolvedOptions(versions, inherited, own_options, sub_results, result)
         return result
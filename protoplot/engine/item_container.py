@@ -1,4 +1,4 @@
-from protoplot.engine.tag import match_tags
+from protoplot.engine.tag import TemplateIndex
 
 class ItemContainer:
     '''
@@ -32,7 +32,7 @@ class ItemContainer:
         self.last = None
         
         # Templates
-        self.__templates = {}
+        self.__templates = TemplateIndex(itemClass)
         
     def add(self, *args, **kwargs):
         item = self.itemClass(*args, **kwargs)
@@ -50,11 +50,7 @@ class ItemContainer:
     # TODO in some places, it should say "selector" instead of "tag" 
 
     def __getitem__(self, tag):
-        # If there is no template for this tag yet, add one 
-        if tag not in self.__templates:
-            self.__templates[tag] = self.itemClass()
-            
-        # Return the template for this tag
+        # Return the template for this tag, adding one if there is none yet
         return self.__templates[tag]
 
     @property
@@ -70,7 +66,7 @@ class ItemContainer:
     def matching_templates(self, tags):
         '''
         Returns a list of applicable templates for an object with the specified
-        tags, in increasing order of preference.
+        tags, in increasing order of preference. The list is shared and must
+        not be modified.
         '''
-        keys = match_tags(self.__templates.keys(), tags)
-        return [self.__templates[key] for key in keys]
+        return self.__templates.matching(tags)
@@ -1,16 +1,43 @@
-from protoplot.engine.tag import match_tags
+from protoplot.engine.options_container import OptionsSchema
+from protoplot.engine.tag import TemplateIndex
 
 class ItemMetaclass(type):
     '''
     Adds the following to each class that uses this metaclass:
       * A __getitem__ that returns a template of the same class
+      * An options_schema method that returns the compiled options schema of
+        the class
     '''
     def __new__(cls, name, bases, attrs):
         result = super().__new__(cls, name, bases, attrs)
-        result.__templates = {}
+        result.__templates = TemplateIndex(result)
+        result.__options_schema = None
         return result
 
 
+    #############
+    ## Options ##
+    #############
+
+    def options_schema(cls):  # @NoSelf
+        '''
+        Returns the options schema shared by all instances of the class.
+
+        The schema is compiled on first use by calling the class's
+        register_options method once, on an uninitialized instance whose
+        options attribute is the schema. As it is a real instance, overriding
+        methods can call super().register_options().
+        '''
+        if cls.__options_schema is None:
+            schema = OptionsSchema()
+            instance = cls.__new__(cls)
+            instance.options = schema
+            cls.register_options(instance)
+            cls.__options_schema = schema
+
+        return cls.__options_schema
+
+
     ###############
     ## Templates ##
     ###############
@@ -20,11 +47,7 @@ class ItemMetaclass(type):
     # defined here for uniformity with ItemContainer.  
 
     def __getitem__(cls, tag):  # @NoSelf
-        # If there is no template for this tag yet, add one 
-        if tag not in cls.__templates:
-            cls.__templates[tag] = cls()
-            
-        # Return the template for this tag
+        # Return the template for this tag, adding one if there is none yet
         return cls.__templates[tag]
 
     @property
@@ -40,7 +63,7 @@ class ItemMetaclass(type):
     def matching_templates(cls, tags):  # @NoSelf
         '''
         Returns a list of applicable templates for an object with the specified
-        tags, in increasing order of preference.
+        tags, in increasing order of preference. The list is shared and must
+        not be modified.
         '''
-        keys = match_tags(cls.__templates.keys(), tags)
-        return [cls.__templates[key] for key in keys]
+        return cls.__templates.matching(tags)
@@ -1,3 +1,4 @@
+import itertools
 import warnings
 
 class _NotSpecified:
@@ -6,14 +7,102 @@ class _NotSpecified:
 
 notSpecified = _NotSpecified
 
+# Versions of options containers. Versions are unique across all containers, so
+# a version identifies both the container and its state.
+_versions = itertools.count(1)
+
 
 
 class _Entry:
-    def __init__(self, default = notSpecified, inherit = False, defer = None):
+    def __init__(self, name, default = notSpecified, inherit = False, defer = None):
+        self.name    = name
         self.default = default
         self.inherit = inherit
         self.defer   = defer
 
+class OptionsSchema():
+    '''
+    The registered options (names and fallbacks) of an options container.
+
+    A schema can be shared by many options containers. Item subclasses compile
+    one schema per class (see ItemMetaclass.options_schema), so the entries are
+    only created once per class rather than once per instance.
+
+    The resolve order of the options (see resolve_order) is computed on first
+    use and cached until the next call to register.
+    '''
+    def __init__(self, other = None):
+        # The registered options. If other is specified, copy its registered
+        # options. Otherwise, start with an empty dict.
+        if other is None:
+            self._entries = {}
+        else:
+            self._entries = dict(other._entries)
+
+        # The cached resolve order, as a list of entries
+        self._resolve_order = None
+
+    def register(self, name, default = notSpecified, inherit = False, defer = None):
+        self._entries[name] = _Entry(name, default, inherit, defer)
+        self._resolve_order = None
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __getitem__(self, name):
+        return self._entries[name]
+
+    def names(self):
+        return self._entries.keys()
+
+    def resolve_order(self):
+        '''
+        Returns a list of option names in resolving order: if a defers to b,
+        then b comes before a in the list.
+
+        Raises ValueError if an option defers to an unknown option or if there
+        is a deferral cycle.
+        '''
+        return [entry.name for entry in self.resolve_entries()]
+
+    def resolve_entries(self):
+        '''
+        Like resolve_order, but returns the entries rather than their names.
+        The returned list is cached and must not be modified.
+        '''
+        if self._resolve_order is None:
+            self._resolve_order = self._sort_entries()
+
+        return self._resolve_order
+
+    def _sort_entries(self):
+        # Depth-first topological sort along the deferral chains. Names are
+        # added to done after their deferral target, and pending contains the
+        # chain currently being followed, which allows detecting cycles.
+        result = []
+        done = set()
+
+        for name in self._entries:
+            pending = []
+            while name is not None and name not in done:
+                if name not in self._entries:
+                    raise ValueError("Option {} defers to unknown option {}".format(
+                        pending[-1], name))
+                if name in pending:
+                    cycle = pending[pending.index(name):] + [name]
+                    raise ValueError("Deferral cycle: {}".format(" -> ".join(cycle)))
+
+                pending.append(name)
+                name = self._entries[name].defer
+
+            # The chain ends at an option that is already done (or has no
+            # deferral), so add the pending options in reverse order.
+            for pending_name in reversed(pending):
+                result.append(self._entries[pending_name])
+                done.add(pending_name)
+
+        return result
+
 class OptionsContainer():
     '''
     An enhanced key/value storage.
@@ -58,11 +147,21 @@ class OptionsContainer():
     The default fallback is a default value of None.
 
     To register a key, call the register method, specifying the name of the key
-    and the fallback option.
+    and the fallback option. The registered keys are stored in an OptionsSchema,
+    which may be shared with other containers (e. g. all instances of an Item
+    subclass). The shared schema is copied before registering a key, so a
+    container never modifies the registered keys of another container.
 
     To set a value for a key (or for multiple keys), call the set method,
     passing the keys and values as kwargs.
 
+    Each change (registering a key, or setting a value directly or indirectly)
+    assigns a new version to the container. Versions are unique across all
+    containers, so callers can cache results derived from a container (e. g.
+    resolved options) and reuse them as long as the version does not change.
+    Note that modifying a value in place (e. g. appending to a list that has
+    been set as a value) is not tracked.
+
     To retrieve options, use the fallback_values() method to retrieve the
     fallback values and the values property to retrieve the values that have
     actually been set.
@@ -70,12 +169,18 @@ class OptionsContainer():
     templates should be evaluated by this class.
     '''
     def __init__(self, other = None):
-        # The registered options. If other is specified, copy its registered
-        # options. Otherwise, start with an ampty dict.
+        # The registered options. If other is a schema, share it (it will be
+        # copied on the first register call). If other is an options container,
+        # copy its registered options. Otherwise, start with an empty schema.
         if other is None:
-            self._entries = {}
+            self._schema = OptionsSchema()
+            self._shared_schema = False
+        elif isinstance(other, OptionsSchema):
+            self._schema = other
+            self._shared_schema = True
         else:
-            self._entries = dict(other._entries)
+            self._schema = OptionsSchema(other._schema)
+            self._shared_schema = False
 
         # The explicitly set values
         self._values = {}
@@ -83,46 +188,54 @@ class OptionsContainer():
         # The indirectly set values
         self._indirect_values = {}
 
+        # The version, changed on every modification
+        self._version = next(_versions)
+
     def register(self, name, default = notSpecified, inherit = False, defer = None):
-        self._entries[name] = _Entry(default, inherit, defer)
+        # Don't modify a schema that other containers may be using
+        if self._shared_schema:
+            self._schema = OptionsSchema(self._schema)
+            self._shared_schema = False
+
+        self._schema.register(name, default, inherit, defer)
+        self._version = next(_versions)
+
+    @property
+    def schema(self):
+        return self._schema
+
+    def resolve_order(self):
+        return self._schema.resolve_order()
+
+    @property
+    def version(self):
+        return self._version
 
     def set(self, **args):
         for key, value in args.items():
-            if key in self._entries:
+            if key in self._schema:
                 self._values[key] = value
+                self._version = next(_versions)
             else:
                 warnings.warn("Ignoring unknown option {}".format(key))
 
     def set_indirect(self, name, value):
-        if name in self._entries:
+        if name in self._schema:
             self._indirect_values[name] = value
+            self._version = next(_versions)
         else:
-            warnings.warn("Ignoring unknown option {}".format(key))
+            warnings.warn("Ignoring unknown option {}".format(name))
 
     def _optionNames(self):
         '''
-        Builds a list of option names in resolving order: if a defers to b, then
-        b must come before a in the list.
+        Returns the list of option names in resolving order: if a defers to b,
+        then b comes before a in the list. See OptionsSchema.resolve_order.
         '''
+        return self._schema.resolve_order()
 
-        unsortedNames = list(self._entries.keys())
-        sortedNames = []
-
-        while unsortedNames:
-            # Pick a name: take the first unsorted name and follow the deferral
-            # chain to the end.
-            name = unsortedNames[0]
-            while self._entries[name].defer and self._entries[name].defer in unsortedNames:
-                name = self._entries[name].defer
-
-            # Add the picked name to the sorted list and remove it from the
-            # unsorted list.
-            sortedNames  .append(name)
-            unsortedNames.remove(name)
-
-        return sortedNames
+    def _resolve_entry(self, entry, templates, inherited, resolvedValues):
+        name = entry.name
 
-    def _resolve_entry(self, name, templates, inherited, resolvedValues):
         # Value
         if name in self._values:
             return self._values[name]
@@ -141,19 +254,15 @@ class OptionsContainer():
         # Template shorthand
 
         # Inherited
-        if self._entries[name].inherit and name in inherited:
+        if entry.inherit and name in inherited:
             return inherited[name]
 
-        # Deferred
-        deferredName = name
-        while deferredName and deferredName not in resolvedValues:
-            entry = self._entries[deferredName]
-            deferredName = entry.defer
-        if deferredName:
-            return resolvedValues[deferredName]
+        # Deferred. Options are resolved in resolve order, so the option we
+        # defer to has already been resolved (unless it has been pruned).
+        if entry.defer is not None and entry.defer in resolvedValues:
+            return resolvedValues[entry.defer]
 
         # Default
-        entry = self._entries[name]
         return entry.default
 
     def resolve(self, templates = None, inherited = None, pruneNotSpecified = False):
@@ -169,12 +278,12 @@ class OptionsContainer():
         if templates is None: templates = list()
         if inherited is None: inherited = dict()
 
-        for name in self._optionNames():
-            resolved = self._resolve_entry(name, templates, inherited, resolvedValues)
+        for entry in self._schema.resolve_entries():
+            resolved = self._resolve_entry(entry, templates, inherited, resolvedValues)
 
             # Add the resolved value to the result dict, unless it is
             # notSpecified and notSpecified is to be pruend.
             if not (resolved is notSpecified and pruneNotSpecified):
-                resolvedValues[name] = resolved
+                resolvedValues[entry.name] = resolved
 
         return resolvedValues
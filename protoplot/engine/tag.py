@@ -31,6 +31,7 @@ def match_tags(selectors, item_tags):
     '''
     
     result = []
+    item_tags = set(item_tags)
     
     # First of all, the default selector (so it has the lowest priority)
     if "" in selectors:
@@ -43,3 +44,63 @@ def match_tags(selectors, item_tags):
                 result.append(selector)
 
     return result
+
+class TemplateIndex:
+    '''
+    The templates of an item class or item container, by selector.
+
+    Templates are created on first access by calling the factory (typically the
+    item class) without arguments. The index maps each selector (which is a
+    tag) to its template, so matching an item only looks up the item's tags
+    rather than testing each selector. The matching templates are memoized per
+    distinct set of tags, so items sharing the same tags share the lookup. The
+    memo is cleared when a template is created.
+    '''
+    def __init__(self, factory):
+        self._factory = factory
+
+        # The templates by selector, in order of creation
+        self._templates = {}
+        # The creation order of each selector
+        self._positions = {}
+        # The matching templates by frozenset of tags
+        self._matches = {}
+
+    def __getitem__(self, selector):
+        # If there is no template for this selector yet, add one
+        if selector not in self._templates:
+            self._templates[selector] = self._factory()
+            self._positions[selector] = len(self._positions)
+            self._matches.clear()
+
+        # Return the template for this selector
+        return self._templates[selector]
+
+    def __contains__(self, selector):
+        return selector in self._templates
+
+    def keys(self):
+        return self._templates.keys()
+
+    def matching(self, tags):
+        '''
+        Returns a list of templates matching the tags, in increasing order of
+        priority (the same order as match_tags). The returned list is shared
+        and must not be modified.
+        '''
+        key = frozenset(tags)
+        result = self._matches.get(key)
+
+        if result is None:
+            selectors = sorted(
+                (tag for tag in key if tag != "" and tag in self._templates),
+                key = self._positions.__getitem__)
+
+            # The default selector has the lowest priority
+            if "" in self._templates:
+                selectors.insert(0, "")
+
+            result = [self._templates[selector] for selector in selectors]
+            self._matches[key] = result
+
+        return result
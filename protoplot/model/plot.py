@@ -33,6 +33,10 @@ class Plot(Item):
         self.options.register("xgrid", False, None)
         self.options.register("ygrid", False, None)
 
+        # Draw series with the same style as one collection, which is much
+        # faster for many series
+        self.options.register("batchSeries", False, False)
+
         # TODO additional options: font_size, size, dpi, grid, bar_labels,
         # bar_stacked
 
@@ -1,5 +1,44 @@
 from protoplot.engine import Item
 
+def _column(data, columnspec):
+    # Returns the values of a column of the data if columnspec is a column
+    # specification (a name or an index), or columnspec itself otherwise
+    if not isinstance(columnspec, (str, int)):
+        return columnspec
+
+    if hasattr(data, "column"):
+        return data.column(columnspec)
+
+    names = getattr(getattr(data, "dtype", None), "names", None)
+    if names:
+        if isinstance(columnspec, int):
+            columnspec = names[columnspec]
+        return data[columnspec]
+
+    return columnspec
+
+def _array(values):
+    # Converts the values to a NumPy array (of floats, with NaN for None, if
+    # possible) once, so they don't have to be converted for each rendering.
+    # NumPy is only imported here, so importing protoplot does not import it.
+    if values is None:
+        return values
+
+    import numpy as np
+    if isinstance(values, np.ndarray):
+        return values
+
+    # Other types (e. g. dates) are kept
+    array = np.asarray(values)
+    if array.dtype.kind in "biu":
+        return array.astype(float)
+    elif array.dtype == object:
+        try:
+            return np.asarray(values, dtype=float)
+        except (TypeError, ValueError):
+            pass
+    return array
+
 class Series(Item):
     def __init__(self, x=None, y=None, data=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -7,8 +46,14 @@ class Series(Item):
         # Data: x, y, lower, upper, color, markercolor, markerfacecolor,
         #   markeredgecolor, fillstyle, label, 
 
-        self.x = x
-        self.y = y
+        # If data is a table (or anything else with a column method) or a
+        # record array, x and y can be column specifications for the data.
+        if data is not None:
+            x = _column(data, x)
+            y = _column(data, y)
+
+        self.x = _array(x)
+        self.y = _array(y)
         self.data = data
 
     def register_options(self):
@@ -32,3 +77,7 @@ class Series(Item):
         self.options.register("legendKey", False, None)
         self.options.register("legendNumPoints", False, 1)
 
+        # Reduce the number of points for rendering: None, "minmax", or "lttb"
+        # (see util.downsample)
+        self.options.register("downsample", False, None)
+
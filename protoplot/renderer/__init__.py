@@ -1 +1,2 @@
-from .renderer import MplRenderer
\ No newline at end of file
+from .renderer import MplRenderer
+from .incremental import IncrementalRenderer
@@ -0,0 +1,200 @@
+import weakref
+
+from protoplot.renderer.renderer import MplRenderer
+
+class _PlotState:
+    '''
+    The figure of a plot rendered by IncrementalRenderer, the artists of its
+    items, and the resolved options they were rendered with.
+    '''
+    def __init__(self, plot, options, figure, artists, layout):
+        self.figure  = figure
+        self.artists = artists  # Item: artist (None for a hidden legend)
+        self.layout  = layout   # Offsets and resolution, see MplRenderer._layout
+
+        # Options are compared by identity: resolving returns the same dict
+        # for an item as long as its options are unchanged.
+        self.plot_options   = options[plot]
+        self.legend_options = options[plot.legend]
+        self.series         = list(plot.series.items)
+        self.series_options = {series: options[series] for series in self.series}
+
+        # For blitting: the figure without the series lines, the axes limits
+        # it was drawn with, and the draw_event callback that stores it
+        self.background = None
+        self.limits     = None
+        self.callback   = None
+
+    def disconnect(self):
+        if self.callback is not None:
+            self.figure.canvas.mpl_disconnect(self.callback)
+            self.callback = None
+
+    def matches(self, plot, options):
+        '''
+        Returns whether the plot can be updated in place, i. e. it has the
+        same series and the same plot and legend options.
+        '''
+        return (not options[plot]['batchSeries']
+            and options[plot] is self.plot_options
+            and options[plot.legend] is self.legend_options
+            and plot.series.items == self.series)
+
+class IncrementalRenderer(MplRenderer):
+    '''
+    A renderer for rendering the same plots repeatedly, e. g. with new data.
+
+    The figure of each plot is kept, along with the artist of each series
+    (Line2D) and of the legend. When a plot is rendered again, the figure is
+    updated in place if possible: the data of each line is replaced with
+    set_data, and the style of a line is only changed (with setters) if the
+    options of the series have changed. The plot is only rendered from
+    scratch (into the same figure) if series were added or removed, or if the
+    options of the plot or legend have changed. Plots with batched series (see
+    Plot option batchSeries) are always rendered from scratch. Text items are
+    not rendered by MplRenderer, so they have no artists.
+
+    If blit is True and the canvas supports it, the lines are animated
+    artists: as long as the axes limits are unchanged, an update only redraws
+    the lines on top of the stored background instead of the whole figure.
+
+    Figures are kept until close is called (or the plot is garbage
+    collected).
+    '''
+    def __init__(self, pyplot=True, blit=True):
+        super().__init__(pyplot)
+        self.blit = blit
+        self._states = weakref.WeakKeyDictionary() # Plot: _PlotState
+
+    def render(self, plot):
+        options = plot.resolve_options()
+
+        state = self._states.get(plot)
+        if state is not None and state.matches(plot, options):
+            self._update(plot, options, state)
+        else:
+            state = self._render_new(plot, options, state)
+            self._states[plot] = state
+
+        return state.figure
+
+    def save(self, plot, file_name):
+        print("Saving to %s" % file_name)
+        self.render(plot).savefig(file_name, bbox_inches='tight')
+
+    def close(self, plot=None):
+        '''
+        Closes the figure of the plot, or of all plots if plot is None.
+        '''
+        plots = list(self._states) if plot is None else [plot]
+        for plot in plots:
+            state = self._states.pop(plot, None)
+            if state is not None:
+                state.disconnect()
+                self._close_figure(state.figure)
+
+
+    ###############
+    ## Rendering ##
+    ###############
+
+    def _render_new(self, plot, options, old_state):
+        # Renders the plot from scratch, reusing the figure of the old state
+        if old_state is None:
+            figure = self._new_figure()
+        else:
+            figure = old_state.figure
+            old_state.disconnect()
+            figure.clear()
+
+        artists = {}
+        self._render_plot(plot, options, figure, artists)
+        state = _PlotState(plot, options, figure, artists,
+            self._layout(plot, options[plot], figure))
+
+        if self.blit and figure.canvas.supports_blit and not options[plot]['batchSeries']:
+            for series in state.series:
+                artists[series].set_animated(True)
+            state.callback = figure.canvas.mpl_connect('draw_event',
+                lambda event: self._store_background(state))
+
+        self._redraw(state)
+        return state
+
+    def _update(self, plot, options, state):
+        plot_options = options[plot]
+        ax = state.figure.axes[0]
+        xoffset, yoffset, resolution = state.layout
+
+        labels_changed = False
+        for series, xoff, yoff in zip(state.series, xoffset, yoffset):
+            line = state.artists[series]
+            series_options = options[series]
+
+            if series_options is not state.series_options[series]:
+                opts = self._series_opts(series_options)
+                labels_changed |= opts['label'] != state.series_options[series]['label']
+                line.set(**opts)
+                state.series_options[series] = series_options
+
+            line.set_data(*self._series_data(series, series_options, xoff, yoff,
+                plot_options['xlog'], plot_options['ylog'], resolution))
+
+        if labels_changed:
+            legend = state.artists[plot.legend]
+            if legend is not None:
+                legend.remove()
+            state.artists[plot.legend] = self._render_legend(ax, plot.legend, options)
+
+        # Limits set by the xlim and ylim options are not changed
+        ax.relim()
+        ax.autoscale_view()
+
+        if labels_changed or state.limits != self._limits(ax):
+            self._redraw(state)
+        else:
+            self._blit(state)
+
+
+    #############
+    ## Drawing ##
+    #############
+
+    def _limits(self, ax):
+        return (tuple(ax.get_xlim()), tuple(ax.get_ylim()))
+
+    def _lines(self, state):
+        return [state.artists[series] for series in state.series]
+
+    def _redraw(self, state):
+        # Draws the whole figure (when the GUI is idle, for interactive
+        # backends). With blitting, the background is stored by the draw_event
+        # callback.
+        state.background = None
+        state.figure.canvas.draw_idle()
+
+    def _store_background(self, state):
+        # Called after the figure has been drawn without the animated lines
+        canvas = state.figure.canvas
+        if canvas.is_saving():
+            return
+
+        ax = state.figure.axes[0]
+        state.background = canvas.copy_from_bbox(state.figure.bbox)
+        state.limits = self._limits(ax)
+        for line in self._lines(state):
+            ax.draw_artist(line)
+
+    def _blit(self, state):
+        # Redraws only the lines on top of the background, or the whole figure
+        # if there is no background (e. g. without blitting)
+        if state.background is None:
+            self._redraw(state)
+            return
+
+        canvas = state.figure.canvas
+        ax = state.figure.axes[0]
+        canvas.restore_region(state.background)
+        for line in self._lines(state):
+            ax.draw_artist(line)
+        canvas.blit(state.figure.bbox)
@@ -6,39 +6,248 @@
 # 
 # # TODO empty plots
  
-import matplotlib.pyplot as plt
+import pickle
 
-from protoplot.util.shift import offset 
+import numpy as np
+
+from protoplot.util.downsample import downsample
+from protoplot.util.shift import apply_offset, offset
 
 inch = 2.54
 
+def _pyplot():
+    # pyplot is only imported when it is used (see MplRenderer), as importing it
+    # is slow and initializes a backend
+    import matplotlib.pyplot as plt
+    return plt
+
+# The rendering session of a worker process of MplRenderer.save_all
+_worker_session = None
+
+def _init_worker():
+    # Worker processes only save figures, so they don't use pyplot (and its
+    # interactive backend) and reuse a single figure
+    global _worker_session
+    _worker_session = MplRenderer(pyplot=False).session()
+
+def _save_plot(payload):
+    # Saves a plot for MplRenderer.save_all. This is a module-level function so
+    # it can be called in worker processes. payload is the pickled plot,
+    # options, and file name (see _RenderPickler).
+    plot, options, file_name = pickle.loads(payload)
+    _worker_session._save(plot, options, file_name)
+
+def _new_item(item_class):
+    return item_class.__new__(item_class)
+
+def _render_payload(*objects):
+    # Pickles the objects with _RenderPickler
+    import io
+    output = io.BytesIO()
+    _RenderPickler(output).dump(objects)
+    return output.getvalue()
+
+class _RenderPickler(pickle.Pickler):
+    '''
+    Pickles plots for rendering in a worker process, without the data of the
+    series: x and y already hold its values, and it may be much larger (e. g.
+    a view of a group that references the columns of the whole table).
+    '''
+    def reducer_override(self, obj):
+        from protoplot.model import Series
+        if isinstance(obj, Series):
+            state = obj.__getstate__()
+            state['data'] = None
+            return (_new_item, (type(obj),), state)
+        return NotImplemented
+
+class _Resolution:
+    '''
+    The horizontal resolution of a rendered plot, for downsampling series.
+    '''
+    def __init__(self, pixels, xlim, xlog):
+        self.pixels = pixels
+        self.xlim   = xlim
+        self.xlog   = xlog
+
+    def downsample(self, x, y, method):
+        return downsample(x, y, method, self.pixels, self.xlim, self.xlog)
+
+class RenderSession:
+    '''
+    A rendering session (see MplRenderer.session), which renders all plots
+    into the same figure. The figure returned by render is only valid until the
+    next plot is rendered or the session is closed.
+
+    Use the session as a context manager to close it, or call close.
+    '''
+    def __init__(self, renderer):
+        self._renderer = renderer
+        self._figure = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _reuse_figure(self):
+        if self._figure is None:
+            self._figure = self._renderer._new_figure()
+        else:
+            self._figure.clear()
+        return self._figure
+
+    def render(self, plot):
+        return self._renderer._render_plot(plot, plot.resolve_options(), self._reuse_figure())
+
+    def save(self, plot, file_name):
+        self._save(plot, plot.resolve_options(), file_name)
+
+    def _save(self, plot, options, file_name):
+        print("Saving to %s" % file_name)
+        fig = self._renderer._render_plot(plot, options, self._reuse_figure())
+        fig.savefig(file_name, bbox_inches='tight')
+
+    def close(self):
+        if self._figure is not None:
+            self._renderer._close_figure(self._figure)
+            self._figure = None
+
 class MplRenderer:
-    def __init__(self):
-        pass
+    '''
+    Renders plots with Matplotlib.
 
-    def _render_series(self, ax, series, options, x_offset, y_offset):
-        series_options = options[series]
+    By default, figures are created with pyplot, so they can be shown with
+    show (or the figure returned by render can be shown interactively).
+    pyplot keeps each figure until it is closed; save closes the figure after
+    saving it.
 
-        print(series_options)
+    If pyplot is False, figures are created with the object-oriented API
+    (Figure and FigureCanvasAgg) and are not registered with pyplot, so they
+    are freed as soon as they are no longer referenced, and pyplot is never
+    imported (so no backend is initialized). show still uses pyplot.
+
+    To render or save many plots, use a session, which reuses a single figure:
+        with renderer.session() as session:
+            for plot, file_name in ...:
+                session.save(plot, file_name)
+    '''
+    def __init__(self, pyplot=True):
+        self.pyplot = pyplot
+
+    def _new_figure(self):
+        if self.pyplot:
+            return _pyplot().figure()
+
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        return fig
+
+    def _close_figure(self, fig):
+        if self.pyplot:
+            _pyplot().close(fig)
+        else:
+            # Break the references between the figure and its artists
+            fig.clear()
+
+    def session(self):
+        '''
+        Returns a RenderSession for rendering or saving many plots with the
+        same figure.
+        '''
+        return RenderSession(self)
 
+    def _series_opts(self, series_options):
         opts = {}
         opts['color'] = series_options['color']  
         opts['markerfacecolor'] = series_options['markerFillColor']
         opts['markeredgecolor'] = series_options['markerLineColor']
         opts['label'] = series_options['label']
+        return opts
+
+    def _series_data(self, series, series_options, x_offset, y_offset, xlog, ylog, resolution):
+        # For logarithmic axes, the offset is applied to the logarithm of the
+        # position.
+        x = apply_offset(series.x, x_offset, xlog)
+        y = apply_offset(series.y, y_offset, ylog)
+
+        if resolution is not None:
+            x, y = resolution.downsample(x, y, series_options['downsample'])
+
+        return x, y
+
+    def _render_series(self, ax, series, options, x_offset, y_offset, xlog=False, ylog=False,
+            resolution=None):
+        series_options = options[series]
+
+        print(series_options)
+
+        opts = self._series_opts(series_options)
 
-        # TODO for logarithmic plots, the offset is to be applied to the
-        # position after applying the logarithm.
-        x = [sx + x_offset for sx in series.x]
-        y = [sy + y_offset for sy in series.y]
+        x, y = self._series_data(series, series_options, x_offset, y_offset, xlog, ylog, resolution)
 
         # TODO we need to do separate plots for different sets of point options,
         # and potentially another one for the series options (for the legend).
         # Note that for fillstyle == 'none', we may not pass a markerfacecolor.
-        ax.plot(x, y, **opts)
+        line, = ax.plot(x, y, **opts)
         # ax.errorbar (xx, yy, yerr=[lower, upper], linestyle="", color=color)        
 
-    def _render_legend(self, ax, legend, options):
+        return line
+
+    def _render_series_batched(self, ax, series_items, options, x_offsets, y_offsets, xlog=False, ylog=False,
+            resolution=None):
+        '''
+        Renders the series, drawing all series with the same style as a single
+        LineCollection instead of one line per series. Returns the legend
+        handles (proxy lines, which are not added to the axes) and labels, in
+        the order of the series.
+        '''
+        from itertools import cycle
+        from matplotlib import rcParams
+        from matplotlib.collections import LineCollection
+        from matplotlib.lines import Line2D
+
+        # Like ax.plot, use the colors of the property cycle for series
+        # without a color
+        cycle_colors = cycle(rcParams['axes.prop_cycle'].by_key()['color'])
+
+        groups = {} # style key: (opts, segments)
+        handles = []
+        labels  = []
+        for series, x_offset, y_offset in zip(series_items, x_offsets, y_offsets):
+            series_options = options[series]
+            opts = self._series_opts(series_options)
+            label = opts.pop('label')
+            if opts['color'] is None:
+                opts['color'] = next(cycle_colors)
+
+            x, y = self._series_data(series, series_options, x_offset, y_offset, xlog, ylog, resolution)
+
+            # Convert units (e. g. dates) to numbers like ax.plot does; this
+            # also sets up the axis for the units (e. g. date ticks)
+            ax.xaxis.update_units(x)
+            ax.yaxis.update_units(y)
+            x = ax.xaxis.convert_units(x)
+            y = ax.yaxis.convert_units(y)
+
+            key = repr(sorted(opts.items()))
+            groups.setdefault(key, (opts, []))[1].append(np.column_stack([x, y]))
+
+            # Labels starting with an underscore are not shown, as for ax.plot
+            if label is not None and not str(label).startswith('_'):
+                handles.append(Line2D([], [], **opts))
+                labels.append(str(label))
+
+        for opts, segments in groups.values():
+            ax.add_collection(LineCollection(segments, colors=opts['color']))
+        ax.autoscale_view()
+
+        return handles, labels
+
+    def _render_legend(self, ax, legend, options, handles=None, labels=None):
         legend_options = options[legend]
 
         location = legend_options['location']
@@ -46,8 +255,14 @@ class MplRenderer:
         opts = {}
         opts['loc'] = location
 
+        # Explicit handles and labels are used for batched series
+        if handles is not None:
+            opts['handles'] = handles
+            opts['labels'] = labels
+
         if location is not None:
-            ax.legend(**opts)
+            return ax.legend(**opts)
+        return None
         
 
 #         if 'loc' in opts:
@@ -61,10 +276,8 @@ class MplRenderer:
 #             ax.legend(handles, labels, **self.options)
 
         
-    def _render_plot(self, plot, options):
-        plot_options = options[plot]
-        print(plot_options)
-
+    def _layout(self, plot, plot_options, fig):
+        # Returns the x and y offsets of the series and the resolution
         size       = plot_options['size'] or (16, 10) 
         dpi        = plot_options['dpi']
         #font_size  = plot_options['font_size']
@@ -76,18 +289,46 @@ class MplRenderer:
 #         plt.rc('figure', dpi = 150, figsize = (width / inch, height / inch))
 #         plt.rc('savefig', dpi = dpi)
 #         plt.rc('legend', fontsize = font_size)
-         
-        fig = plt.figure()
-        ax = fig.add_subplot(111)
 
         # FIXME this must be in the model
         xoffset = offset(plot_options['xshift'], len(plot.series.items))
         yoffset = offset(plot_options['yshift'], len(plot.series.items))
 
-        for series, xoff, yoff in zip(plot.series.items, xoffset, yoffset):
-            self._render_series(ax, series, options, xoff, yoff)
+        # The number of pixels across the plot, for downsampling series. This
+        # is an upper bound, as the axes are narrower than the figure.
+        resolution = _Resolution(int(width / inch * (dpi or fig.dpi)),
+            plot_options['xlim'] or None, plot_options['xlog'])
 
-        self._render_legend(ax, plot.legend, options)
+        return xoffset, yoffset, resolution
+
+    def _render_plot(self, plot, options, fig=None, artists=None):
+        '''
+        Renders the plot into a new figure or the specified (empty) figure and
+        returns the figure. If artists is a dict, the artists of the series
+        (unless batched) and of the legend are added to it.
+        '''
+        plot_options = options[plot]
+        print(plot_options)
+
+        if fig is None:
+            fig = self._new_figure()
+        ax = fig.add_subplot(111)
+
+        xoffset, yoffset, resolution = self._layout(plot, plot_options, fig)
+
+        if artists is None:
+            artists = {}
+
+        if plot_options['batchSeries']:
+            handles, labels = self._render_series_batched(ax, plot.series.items, options,
+                xoffset, yoffset, plot_options['xlog'], plot_options['ylog'], resolution)
+        else:
+            handles, labels = None, None
+            for series, xoff, yoff in zip(plot.series.items, xoffset, yoffset):
+                artists[series] = self._render_series(ax, series, options, xoff, yoff,
+                    plot_options['xlog'], plot_options['ylog'], resolution)
+
+        artists[plot.legend] = self._render_legend(ax, plot.legend, options, handles, labels)
 
         #for text in plot.text.items:
         #    self._render_text(ax, text, options)
@@ -111,8 +352,8 @@ class MplRenderer:
         if xgrid is not None: ax.xaxis.grid(xgrid)
         if ygrid is not None: ax.yaxis.grid(ygrid)
  
-        if (plot_options['xlog']): ax.set_xscale("log", nonposx='clip')
-        if (plot_options['ylog']): ax.set_yscale("log", nonposy='clip')
+        if (plot_options['xlog']): ax.set_xscale("log", nonpositive='clip')
+        if (plot_options['ylog']): ax.set_yscale("log", nonpositive='clip')
  
         #ax.xaxis.set_ticks(plot_options['xticks'])
         #ax.yaxis.set_ticks(plot_options['yticks'])
@@ -136,10 +377,63 @@ class MplRenderer:
         return self._render_plot(plot, options)
     
     def show(self, plot):
-        self.render(plot)
+        # Showing a figure requires pyplot
+        plt = _pyplot()
+        self._render_plot(plot, plot.resolve_options(), plt.figure())
         plt.show()
     
     def save(self, plot, file_name):
-        print("Saving to %s" % file_name)
-        fig = self.render(plot)
-        fig.savefig(file_name, bbox_inches='tight')
+        with self.session() as session:
+            session.save(plot, file_name)
+
+    def save_all(self, plots, file_names, max_workers=None):
+        '''
+        Saves many plots (any iterable, e. g. a generator) to the corresponding
+        file names in a pool of max_workers processes (default: one per CPU; 1
+        saves the plots in this process) and returns a dict(file name:
+        exception) for the plots that could not be saved.
+
+        The options of each plot are resolved once, in this process, so
+        templates set here apply to the plots. The workers render without
+        pyplot (see MplRenderer), reusing one figure per worker.
+        Plots are taken from the iterable as workers become available, so a
+        generator does not have to create all plots in advance.
+        '''
+        errors = {}
+
+        if max_workers == 1:
+            with self.session() as session:
+                for plot, file_name in zip(plots, file_names):
+                    try:
+                        session.save(plot, file_name)
+                    except Exception as e:
+                        errors[file_name] = e
+            return errors
+
+        import os
+        from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        # Limit the number of pending plots, so they are not all kept in memory
+        max_pending = 2 * (max_workers or os.cpu_count() or 1)
+
+        pending = {} # future: file name
+        def collect(return_when):
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                file_name = pending.pop(future)
+                if future.exception() is not None:
+                    errors[file_name] = future.exception()
+
+        with ProcessPoolExecutor(max_workers, initializer=_init_worker) as executor:
+            for plot, file_name in zip(plots, file_names):
+                if len(pending) >= max_pending:
+                    collect(FIRST_COMPLETED)
+                try:
+                    options = plot.resolve_options()
+                    payload = _render_payload(plot, options, file_name)
+                    pending[executor.submit(_save_plot, payload)] = file_name
+                except Exception as e:
+                    errors[file_name] = e
+            collect(ALL_COMPLETED)
+
+        return errors
@@ -0,0 +1,121 @@
+import numpy as np
+
+def _is_sorted(x):
+    return len(x) < 2 or bool(np.all(x[1:] >= x[:-1]))
+
+def minmax(x, y, bucket_count, x_range=None, log=False):
+    '''
+    Reduces a line with ascending x values to the first, last, minimum, and
+    maximum point of each of bucket_count buckets of equal width in x (in log
+    space if log is True), spanning x_range (default: the range of x). When
+    the buckets are pixel columns, the line is drawn the same as with all
+    points.
+
+    Points left and right of x_range are reduced to a single bucket each, and
+    points with a NaN y value (gaps in the line) are kept. Returns (x, y) as
+    arrays; if x is not sorted, the data is returned unchanged.
+    '''
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) <= 4 * bucket_count or not _is_sorted(x):
+        return x, y
+
+    position = x
+    if log:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            position = np.log10(x)
+            x_range = None if x_range is None else np.log10(x_range)
+
+    if x_range is None:
+        finite = position[np.isfinite(position)]
+        x_range = (finite[0], finite[-1]) if len(finite) else (0, 1)
+
+    # Bucket 0 is left of the range, bucket bucket_count + 1 is right of it
+    # (including non-finite positions, e. g. from log(0)).
+    start, stop = x_range
+    width = (stop - start) or 1
+    with np.errstate(invalid="ignore"):
+        buckets = np.floor((position - start) / width * bucket_count) + 1
+    buckets = np.clip(np.nan_to_num(buckets, nan=0, neginf=0), 0, bucket_count + 1).astype(np.intp)
+    buckets[position == stop] = bucket_count # The last bucket includes the end
+
+    # The buckets are ascending, so each one is a contiguous range of points
+    starts = np.flatnonzero(np.diff(buckets, prepend=-1))
+    ends = np.append(starts[1:], len(buckets)) - 1
+
+    keep = np.zeros(len(x), dtype=bool)
+    keep[starts] = True
+    keep[ends] = True
+    keep |= np.isnan(y)
+
+    # The first point with the minimum and the maximum of each bucket (NaN
+    # values are ignored)
+    group = np.repeat(np.arange(len(starts)), ends - starts + 1)
+    with np.errstate(invalid="ignore"):
+        for extreme in [np.fmin.reduceat(y, starts), np.fmax.reduceat(y, starts)]:
+            matches = np.flatnonzero(y == extreme[group])
+            _, first = np.unique(group[matches], return_index=True)
+            keep[matches[first]] = True
+
+    return x[keep], y[keep]
+
+def lttb(x, y, point_count):
+    '''
+    Reduces a line with ascending x values to point_count points with the
+    Largest-Triangle-Three-Buckets algorithm, which preserves the visual shape
+    of the line. The first and last points are kept.
+
+    Returns (x, y) as arrays; if x is not sorted or the data contains NaN
+    values, the data is returned unchanged.
+    '''
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) <= point_count or point_count < 3 or not _is_sorted(x) \
+            or not np.all(np.isfinite(x)) or not np.all(np.isfinite(y)):
+        return x, y
+
+    # The points between the first and the last one are divided into
+    # point_count - 2 buckets
+    edges = np.linspace(1, len(x) - 1, point_count - 1).astype(np.intp)
+
+    selected = np.empty(point_count, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = len(x) - 1
+
+    previous = 0
+    for bucket in range(point_count - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+
+        # The average point of the next bucket (or the last point)
+        if bucket + 2 < len(edges):
+            next_start, next_stop = edges[bucket + 1], edges[bucket + 2]
+            next_x = x[next_start:next_stop].mean()
+            next_y = y[next_start:next_stop].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+
+        # Select the point that forms the largest triangle with the previously
+        # selected point and the average of the next bucket
+        areas = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous]) -
+                       (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+
+    return x[selected], y[selected]
+
+def downsample(x, y, method, pixels, x_range=None, log=False):
+    '''
+    Reduces a line to be drawn with a width of the specified number of pixels,
+    using the specified method:
+      * None (or False): no reduction
+      * "minmax": see minmax, with one bucket per pixel
+      * "lttb": see lttb, with two points per pixel
+    '''
+    if not method:
+        return x, y
+    elif method == "minmax":
+        return minmax(x, y, pixels, x_range, log)
+    elif method == "lttb":
+        return lttb(x, y, 2 * pixels)
+    else:
+        raise ValueError("Unsupported downsampling method: {}".format(repr(method)))
@@ -1,5 +1,7 @@
 import numbers
 
+import numpy as np
+
 def offset(shift_spec, count):
     # No shift at all - all values are 0
     if shift_spec is None:
@@ -22,3 +24,21 @@ def offset(shift_spec, count):
     
     else:
         raise ValueError("Unsupported shift_spec: {}".format(repr(shift_spec)))
+
+def apply_offset(values, offset, log=False):
+    # Returns the values shifted by the offset, as an array. For a logarithmic
+    # axis, the offset is applied to the logarithm (base 10) of the values,
+    # i. e. the values are multiplied by 10**offset. Numeric values are
+    # converted to floats; other values (e. g. datetime64, which can be shifted
+    # by a timedelta64) keep their type.
+    values = np.asarray(values)
+    if not offset:
+        return values
+    elif values.dtype.kind not in "biuf":
+        return values + offset
+
+    values = values.astype(float, copy=False)
+    if log:
+        return values * 10.0 ** offset
+    else:
+        return values + offset
@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+
+from protoplot.data.cache import TableCache
+from protoplot.data.table import Table
+
+class TestTableCache(unittest.TestCase):
+    ##################
+    ## Test fixture ##
+    ##################
+
+    column_setup = [
+        {"index": 0, "header": "x", "name": "x", "datatype": float},
+        {"index": 1, "header": "label", "name": "label"},
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_directory = os.path.join(self.directory, "cache")
+        self.file_name = os.path.join(self.directory, "data.csv")
+        self.writeFile("x,label\n1.5,a\n-,b\n3,c\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def writeFile(self, data):
+        with open(self.file_name, "w", newline="") as csv_file:
+            csv_file.write(data)
+
+    def read(self):
+        return Table.from_csv(self.file_name, cache=self.cache_directory, column_setup=self.column_setup)
+
+    def cacheEntries(self):
+        return len(os.listdir(self.cache_directory))
+
+
+    ###########
+    ## Tests ##
+    ###########
+
+    def testCache(self):
+        # First read: the table is stored in the cache
+        table = self.read()
+        self.assertEqual(self.cacheEntries(), 1)
+        expected = [["x", "label"], [1.5, "a"], [None, "b"], [3.0, "c"]]
+        self.assertEqual(list(table.all_rows()), expected)
+
+        # Second read: the table is loaded from the cache, memory-mapped
+        table = self.read()
+        self.assertEqual(self.cacheEntries(), 1)
+        self.assertEqual(list(table.all_rows()), expected)
+        self.assertEqual(table.resolve_column("label"), 1)
+        self.assertIsInstance(table._columns[0].values, np.memmap)
+
+        # Operations on the cached table work as usual
+        self.assertEqual(table.filter({"label": "c"}).data_rows(), [[3.0, "c"]])
+
+    def testInvalidation(self):
+        self.read()
+
+        # Different arguments
+        Table.from_csv(self.file_name, cache=self.cache_directory)
+        self.assertEqual(self.cacheEntries(), 2)
+
+        # Modified file
+        self.writeFile("x,label\n1.5,a\n2.5,b\n")
+        table = self.read()
+        self.assertEqual(self.cacheEntries(), 3)
+        self.assertEqual(table.data_rows(), [[1.5, "a"], [2.5, "b"]])
+
+    def readMapped(self, mapping):
+        column_setup = self.column_setup + [{"index": 0, "mapping": mapping}]
+        return Table.from_csv(self.file_name, cache=self.cache_directory, column_setup=column_setup)
+
+    def testFunctionArguments(self):
+        # Equal lambdas (e. g. from separate runs) have the same key
+        self.readMapped(lambda x: x * 2)
+        table = self.readMapped(lambda x: x * 2)
+        self.assertEqual(self.cacheEntries(), 1)
+        self.assertEqual(table.column("x").tolist()[0], 3.0)
+
+        # A changed lambda or closure value has a different key
+        factor = 3
+        table = self.readMapped(lambda x: x * factor)
+        self.assertEqual(table.column("x").tolist()[0], 4.5)
+        factor = 4
+        table = self.readMapped(lambda x: x * factor)
+        self.assertEqual(table.column("x").tolist()[0], 6.0)
+        self.assertEqual(self.cacheEntries(), 3)
+
+    def testChangedFunction(self):
+        # A named function whose body has changed has a different key
+        def scale(x):
+            return x * 2
+        scale.__qualname__ = "scale"
+        self.readMapped(scale)
+
+        def scale(x): # @DuplicatedSignature
+            return x * 10
+        scale.__qualname__ = "scale"
+        table = self.readMapped(scale)
+        self.assertEqual(self.cacheEntries(), 2)
+        self.assertEqual(table.column("x").tolist()[0], 15.0)
+
+    def testUndescribableArgument(self):
+        # An argument that has no stable description is not cached
+        class Mapping:
+            def __call__(self, x):
+                return -x
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            table = self.readMapped(Mapping())
+        self.assertEqual(len(caught), 1)
+        self.assertEqual(table.column("x").tolist()[0], -1.5)
+        self.assertFalse(os.path.exists(self.cache_directory))
+
+    def testObjectColumns(self):
+        # Columns with mixed types are stored as object arrays
+        cache = TableCache(self.cache_directory)
+        table = Table.from_columns([[1, "a", None]], ["mixed"])
+        cache.store("mixed", table)
+        self.assertEqual(list(cache.load("mixed", Table).all_rows()), [["mixed"], [1], ["a"], [None]])
+        self.assertIsNone(cache.load("other", Table))
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
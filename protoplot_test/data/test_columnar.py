@@ -0,0 +1,84 @@
+import unittest
+
+import numpy as np
+
+from protoplot.data.columnar import Column, parse_floats
+
+class TestColumnar(unittest.TestCase):
+    #############
+    ## Parsing ##
+    #############
+
+    def assertParsed(self, parsed, values, mask):
+        floats, parsed_mask = parsed
+        self.assertEqual(floats.dtype, np.float64)
+        self.assertEqual(parsed_mask.tolist(), mask)
+        self.assertEqual(floats[~parsed_mask].tolist(), [v for v, m in zip(values, mask) if not m])
+
+    def testParseFloats(self):
+        # Decimal point
+        self.assertParsed(parse_floats(["1.5", "-2", "3e2"]), [1.5, -2, 300], [False, False, False])
+
+        # Decimal comma
+        self.assertParsed(parse_floats(["1,5", "-2", "3,25"]), [1.5, -2, 3.25], [False, False, False])
+
+        # Missing values
+        self.assertParsed(parse_floats(["1", "", "-", "2,5"]), [1, None, None, 2.5], [False, True, True, False])
+
+        # Array with an existing mask
+        self.assertParsed(parse_floats(np.array(["1", "x", "3"]), np.array([False, True, False])),
+            [1, None, 3], [False, True, False])
+
+        # Mixed values, e. g. from Excel
+        self.assertParsed(parse_floats([1.5, "2,5", None, ""]), [1.5, 2.5, None, None], [False, False, True, True])
+
+        # Empty
+        self.assertParsed(parse_floats([]), [], [])
+
+        # Invalid values
+        with self.assertRaises(ValueError):
+            parse_floats(["1", "x"])
+
+
+    ############
+    ## Column ##
+    ############
+
+    def testFromList(self):
+        column = Column.from_list(["a", None, "b"])
+        self.assertEqual(column.values.dtype.kind, "U")
+        self.assertEqual(column.to_list(), ["a", None, "b"])
+
+        column = Column.from_list([1, None, 2.5])
+        self.assertEqual(column.values.dtype, np.float64)
+        self.assertEqual(column.to_list(), [1, None, 2.5])
+
+        column = Column.from_list([1, "a"])
+        self.assertEqual(column.values.dtype, object)
+        self.assertEqual(column.to_list(), [1, "a"])
+
+    def testAsType(self):
+        column = Column.from_list(["1", None, "3"])
+        self.assertEqual(column.astype(int  ).to_list(), [1  , None, 3  ])
+        self.assertEqual(column.astype(float).to_list(), [1.0, None, 3.0])
+        self.assertEqual(column.astype(lambda v: v + "!").to_list(), ["1!", None, "3!"])
+
+    def testTake(self):
+        column = Column.from_list([0, 1, None, 3, 4, 5])
+
+        # A view does not copy the values until they are accessed
+        view = column.take([0, 2, 3, 5])
+        self.assertTrue(view.is_view())
+        self.assertEqual(len(view), 4)
+
+        # Taking from a view refers to the original column
+        view = view.take(np.array([False, True, True, True]))
+        self.assertIs(view._base, column)
+        self.assertEqual(view._index.tolist(), [2, 3, 5])
+
+        self.assertEqual(view.to_list(), [None, 3, 5])
+        self.assertFalse(view.is_view())
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
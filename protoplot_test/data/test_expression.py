@@ -0,0 +1,82 @@
+import unittest
+
+from protoplot.data.columnar import Column
+from protoplot.data.expression import Expression
+
+class TestExpression(unittest.TestCase):
+    columns = {
+        "t"   : Column.from_list([0, 1, 2, 3, 4]),
+        "temp": Column.from_list([20.5, None, 41.25, None, 45.0]),
+        "mode": Column.from_list(["fast", "slow", "fast", "fast", "slow"]),
+        "misc": Column.from_list([1, "a", None, 2.5, "b"]),
+    }
+
+    def evaluate(self, source):
+        return Expression(source).evaluate(self.columns, 5).tolist()
+
+    def testNames(self):
+        self.assertEqual(Expression("temp > 40 and mode == 'fast' or temp < t").names, ["temp", "mode", "t"])
+
+    def testComparison(self):
+        self.assertEqual(self.evaluate("t >= 3"            ), [False, False, False, True , True ])
+        self.assertEqual(self.evaluate("1 <= t < 3"        ), [False, True , True , False, False])
+        self.assertEqual(self.evaluate("mode == 'slow'"    ), [False, True , False, False, True ])
+        self.assertEqual(self.evaluate("mode == 1"         ), [False, False, False, False, False])
+        self.assertEqual(self.evaluate("t in [0, 4]"       ), [True , False, False, False, True ])
+        self.assertEqual(self.evaluate("mode not in ('slow',)"), [True , False, True , True , False])
+        self.assertEqual(self.evaluate("misc == 'a'"       ), [False, True , False, False, False])
+
+    def testMissingValues(self):
+        # Comparisons with missing values are false
+        self.assertEqual(self.evaluate("temp > 30"        ), [False, False, True , False, True ])
+        self.assertEqual(self.evaluate("temp <= 30"       ), [True , False, False, False, False])
+        self.assertEqual(self.evaluate("temp == None"     ), [False, True , False, True , False])
+        self.assertEqual(self.evaluate("temp != None"     ), [True , False, True , False, True ])
+        self.assertEqual(self.evaluate("temp in [None, 45]"), [False, True , False, True , True ])
+
+    def testLogicAndArithmetic(self):
+        self.assertEqual(self.evaluate("temp > 40 and mode == 'fast'"), [False, False, True , False, False])
+        self.assertEqual(self.evaluate("t == 0 or mode == 'slow'"    ), [True , True , False, False, True ])
+        self.assertEqual(self.evaluate("not t % 2"                   ), [True , False, True , False, True ])
+        self.assertEqual(self.evaluate("abs(temp - 2 * t * 10) < 2"  ), [False, False, True , False, False])
+        self.assertEqual(self.evaluate("True"                        ), [True ] * 5)
+
+    def testUnsafe(self):
+        for source in [
+                "__import__('os')",
+                "t.__class__",
+                "[x for x in t]",
+                "t[0]",
+                "lambda: 0",
+                "t in mode",
+                "abs(t, key=1)",
+                "mode == 'a' * 10**10",
+                "t < 1" + "0" * 30,
+                ]:
+            with self.subTest(source = source):
+                with self.assertRaises(ValueError):
+                    Expression(source)
+
+    def testBoundedCost(self):
+        # Constant arithmetic is done with 64-bit numbers, so these overflow
+        # instead of computing a huge number (here, the overflowed exponent is
+        # negative, which is not allowed for integers)
+        with self.assertRaises(ValueError):
+            self.evaluate("temp > 9**9**9**9")
+        self.assertEqual(self.evaluate("t < 9.0**9.0**9.0**9.0"), [True] * 5)
+
+        # Arithmetic on string columns is rejected when evaluated
+        with self.assertRaises(ValueError):
+            self.evaluate("mode * 10**10 == 'a'")
+
+    def testIncompatibleComparison(self):
+        # Equality of different types is false, ordering them is rejected
+        for source in ["mode > 1", "t < 'a'", "misc < 2"]:
+            with self.subTest(source = source):
+                with self.assertRaises(ValueError):
+                    self.evaluate(source)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+
+from protoplot.data.table import Table
+
+class TestQuery(unittest.TestCase):
+    ##################
+    ## Test fixture ##
+    ##################
+
+    csv_data = (
+        "time;temp;mode\n"
+        "0;20,5;fast\n"
+        "1;-;slow\n"
+        "2;41,25;fast\n"
+        "3;;fast\n"
+        "4;45;slow\n"
+    )
+
+    column_setup = [
+        {"index": 0, "header": "time", "name": "t"   , "datatype": int  },
+        {"index": 1, "header": "temp", "name": "temp", "datatype": float},
+        {"index": 2, "header": "mode", "name": "mode"                   },
+    ]
+
+    def setUp(self):
+        handle, self.file_name = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, "w", newline="") as csv_file:
+            csv_file.write(self.csv_data)
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def queries(self):
+        # Yields a query on a table with each kind of storage and on the file,
+        # with and without chunks
+        for columnar in [False, True]:
+            with self.subTest(source = "table", columnar = columnar):
+                table = Table.from_csv(self.file_name, delimiter=";", columnar=columnar,
+                    column_setup=self.column_setup)
+                yield table.lazy()
+
+        for chunk_size in [None, 2]:
+            with self.subTest(source = "file", chunk_size = chunk_size):
+                yield Table.scan_csv(self.file_name, delimiter=";", chunk_size=chunk_size,
+                    column_setup=self.column_setup)
+
+
+    ###########
+    ## Tests ##
+    ###########
+
+    def testQuery(self):
+        for query in self.queries():
+            result = query \
+                .map_column("temp", lambda temp: temp * 2) \
+                .filter({"mode": "fast"}) \
+                .columns(["t", "temp"]) \
+                .filter(lambda t, temp: temp is not None)
+
+            self.assertEqual(result.data_rows(), [[0, 41.0], [2, 82.5]])
+            self.assertEqual(result.column(1).tolist() if result.collect().is_columnar()
+                else result.column(1), [41.0, 82.5])
+
+    def testExpression(self):
+        for query in self.queries():
+            result = query \
+                .map_column("temp", lambda temp: temp * 2) \
+                .filter("mode == 'fast' and temp != None") \
+                .columns(["t", "temp"])
+
+            self.assertEqual(result.data_rows(), [[0, 41.0], [2, 82.5]])
+            self.assertEqual(result.column(1).tolist() if result.collect().is_columnar()
+                else result.column(1), [41.0, 82.5])
+
+    def testSourceUnchanged(self):
+        table = Table.from_csv(self.file_name, delimiter=";", column_setup=self.column_setup)
+        table.lazy().map_column("t", lambda t: -t).collect()
+        self.assertEqual(table.column("t"), [0, 1, 2, 3, 4])
+
+    def testPlan(self):
+        query = Table.scan_csv(self.file_name, delimiter=";", column_setup=self.column_setup)
+        query = query \
+            .map_column("temp", abs) \
+            .map_column("mode", str.upper) \
+            .filter({"t": 1}) \
+            .columns(["temp"])
+
+        column_ids, steps = query.plan()
+
+        # The filter is moved before the maps, and mode is not used
+        self.assertEqual(column_ids, [0, 1])
+        self.assertEqual([(kind, ids) for kind, ids, _ in steps], [("filter", [0]), ("map", 1)])
+
+    def testUnusedColumnsNotParsed(self):
+        # Parsing the mode column as float would fail
+        column_setup = self.column_setup + [{"index": 2, "datatype": float}]
+        query = Table.scan_csv(self.file_name, delimiter=";", column_setup=column_setup)
+        self.assertEqual(query.columns(["t"]).data_rows(), [[0], [1], [2], [3], [4]])
+
+    def testGroupBy(self):
+        for query in self.queries():
+            groups = query.columns(["mode", "t"]).group_by("mode")
+            self.assertEqual(list(groups), ["fast", "slow"])
+            self.assertEqual(groups["slow"].data_rows(), [["slow", 1], ["slow", 4]])
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,493 @@
+import io
+import os
+import tempfile
+import unittest
+
+from math import isnan
+from unittest import mock
+
+from protoplot.data.table import Table
+
+class _Sheet:
+    # A fake xlrd sheet with the cell values of a list of rows
+    def __init__(self, rows):
+        self.rows  = rows
+        self.nrows = len(rows)
+        self.ncols = len(rows[0]) if rows else 0
+
+    def cell_value(self, row, column):
+        return self.rows[row][column]
+
+    def col_values(self, column, start_row=0, end_row=None):
+        return [row[column] for row in self.rows[start_row:end_row]]
+
+class TestTable(unittest.TestCase):
+    '''
+    Tests the table operations. Each test is run for both row storage and
+    columnar storage, which must give the same results.
+    '''
+
+    ##################
+    ## Test fixture ##
+    ##################
+
+    csv_data = (
+        "time;temp;mode\n"
+        "0;20,5;fast\n"
+        "1;-;slow\n"
+        "2;41,25;fast\n"
+        "3;;fast\n"
+        "4;45;slow\n"
+    )
+
+    def setUp(self):
+        handle, self.file_name = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, "w", newline="") as csv_file:
+            csv_file.write(self.csv_data)
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def tables(self):
+        # Yields a freshly-read table for each kind of storage
+        for columnar in [False, True]:
+            with self.subTest(columnar = columnar):
+                table = Table.from_csv(self.file_name, delimiter=";", columnar=columnar)
+                self.assertEqual(table.is_columnar(), columnar)
+                yield table
+
+    def setUpColumns(self, table):
+        table.setup_column(0, "time", "t"   , int)
+        table.setup_column(1, "temp", "temp", float)
+        table.setup_column(2, "mode", "mode")
+
+
+    ##################
+    ## Construction ##
+    ##################
+
+    def testRead(self):
+        for table in self.tables():
+            self.assertEqual(table.column_count(), 3)
+            self.assertEqual(table.data_row_count(), 5)
+            self.assertEqual(list(table.all_rows())[0], ["time", "temp", "mode"])
+            self.assertEqual(table.data_rows()[1], ["1", "-", "slow"])
+
+    def testReadChunked(self):
+        column_setup = [
+            {"index": 0, "header": "time", "name": "t"   , "datatype": int  },
+            {"index": 1, "header": "temp", "name": "temp", "datatype": float},
+        ]
+
+        expected = Table.from_csv(self.file_name, delimiter=";", column_setup=column_setup)
+
+        # Read in chunks
+        for chunk_size in [1, 2, 5, 10]:
+            with self.subTest(chunk_size = chunk_size):
+                table = Table.from_csv(self.file_name, delimiter=";", chunk_size=chunk_size,
+                    column_setup=column_setup)
+                self.assertTrue(table.is_columnar())
+                self.assertEqual(list(table.all_rows()), list(expected.all_rows()))
+                self.assertEqual(table.resolve_column("temp"), 1)
+
+        # Iterate over the chunks
+        chunks = list(Table.iter_csv(self.file_name, 2, delimiter=";", column_setup=column_setup))
+        self.assertEqual([chunk.data_row_count() for chunk in chunks], [2, 2, 1])
+        self.assertEqual(list(chunks[2].all_rows()), [["time", "temp", "mode"], [4, 45.0, "slow"]])
+
+    def testReadColumns(self):
+        column_setup = [
+            {"index": 0, "header": "time", "name": "t"   , "datatype": int  },
+            {"index": 2, "header": "mode", "name": "mode", "datatype": float}, # Not read
+        ]
+        for chunk_size in [None, 2]:
+            table = Table.from_csv(self.file_name, delimiter=";", usecols=[1, 0],
+                column_setup=column_setup, chunk_size=chunk_size)
+            self.assertEqual(list(table.all_rows()), [
+                ["temp", "time"],
+                ["20,5", 0], ["-", 1], ["41,25", 2], ["", 3], ["45", 4],
+            ])
+
+    def read_excel(self, rows, **kwargs):
+        # Yields a table read from a fake Excel sheet for each kind of storage
+        workbook = mock.Mock()
+        workbook.sheet_by_name.return_value = _Sheet(rows)
+        xlrd = mock.Mock()
+        xlrd.open_workbook.return_value = workbook
+
+        for columnar in [False, True]:
+            with self.subTest(columnar = columnar):
+                with mock.patch.dict("sys.modules", xlrd=xlrd):
+                    table = Table.from_excel("data.xls", "Sheet", columnar=columnar, **kwargs)
+                xlrd.open_workbook.assert_called_with("data.xls", on_demand=True)
+                workbook.sheet_by_name.assert_called_with("Sheet")
+                workbook.release_resources.assert_called()
+                self.assertEqual(table.is_columnar(), columnar)
+                yield table
+
+    def testReadExcel(self):
+        rows = [["time", "temp", "mode"]] + [[float(t), 20.0 + t, mode]
+            for t, mode in enumerate(["fast", "slow", "fast", "fast", "slow"])]
+
+        for table in self.read_excel(rows):
+            self.assertEqual(list(table.all_rows()), rows)
+
+        # The range is counted without the header row
+        for table in self.read_excel(rows, row_range=(1, 3)):
+            self.assertEqual(list(table.all_rows()), [rows[0], rows[2], rows[3]])
+        for table in self.read_excel(rows, row_range=(4, None)):
+            self.assertEqual(list(table.all_rows()), [rows[0], rows[5]])
+
+        # Without a header, the range starts at the first row
+        for table in self.read_excel(rows[1:], header=False, row_range=(1, 3)):
+            self.assertEqual(table.data_rows(), [rows[2], rows[3]])
+        for table in self.read_excel(rows[1:], header=False, row_range=(3, 10)):
+            self.assertEqual(table.data_rows(), [rows[4], rows[5]])
+
+    def testReadExcelColumns(self):
+        rows = [["time", "temp", "mode"], [0.0, 20.5, "fast"], [1.0, 41.25, "slow"]]
+        column_setup = [
+            {"index": 0, "header": "time", "name": "t"   , "datatype": int  },
+            {"index": 2, "header": "mode", "name": "mode", "datatype": float}, # Not read
+        ]
+        for table in self.read_excel(rows, usecols=[1, 0], column_setup=column_setup):
+            self.assertEqual(list(table.all_rows()), [
+                ["temp", "time"], [20.5, 0], [41.25, 1],
+            ])
+            self.assertEqual(table.resolve_column("t"), 1)
+
+    def testReadFiles(self):
+        column_setup = [
+            {"index": 0, "header": "time", "name": "t"   , "datatype": int  },
+            {"index": 1, "header": "temp", "name": "temp", "datatype": float},
+        ]
+
+        # A second file, a file with a different header, and a missing file
+        handle, second = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, "w") as csv_file:
+            csv_file.write("time;temp;mode\n5;50;fast\n")
+        handle, other = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, "w") as csv_file:
+            csv_file.write("x;temp;mode\n5;50;fast\n")
+        self.addCleanup(os.remove, second)
+        self.addCleanup(os.remove, other)
+
+        file_names = [self.file_name, other, second, "missing.csv"]
+        for max_workers in [1, 2]:
+            with self.subTest(max_workers = max_workers):
+                table, errors = Table.from_csv_files(file_names, max_workers=max_workers,
+                    delimiter=";", column_setup=column_setup)
+
+                self.assertEqual(sorted(errors), sorted([other, "missing.csv"]))
+                self.assertIsInstance(errors[other], ValueError)
+                self.assertIsInstance(errors["missing.csv"], FileNotFoundError)
+
+                self.assertTrue(table.is_columnar())
+                self.assertEqual(list(table.all_rows())[0], ["time", "temp", "mode", "file"])
+                self.assertEqual(table.column("t").tolist(), [0, 1, 2, 3, 4, 5])
+                self.assertEqual(table.filter({"file": second}).data_rows(), [[5, 50.0, "fast", second]])
+
+    def testReadRowLengths(self):
+        with open(self.file_name, "a") as csv_file:
+            csv_file.write("5;50\n")
+
+        for chunk_size in [None, 2]:
+            with self.subTest(chunk_size = chunk_size):
+                with self.assertRaisesRegex(NotImplementedError, "Rows have different lengths"):
+                    Table.from_csv(self.file_name, delimiter=";", chunk_size=chunk_size)
+
+    def testIndependentTables(self):
+        # Tables must not share their data
+        table1 = Table.from_csv(self.file_name, delimiter=";")
+        table2 = Table.from_csv(self.file_name, delimiter=";")
+        self.assertEqual(table1.data_row_count(), 5)
+        self.assertEqual(table2.data_row_count(), 5)
+
+    def testConversion(self):
+        rows = Table.from_csv(self.file_name, delimiter=";")
+        self.setUpColumns(rows)
+
+        columnar = rows.to_columnar()
+        self.assertTrue(columnar.is_columnar())
+        self.assertEqual(list(columnar.all_rows()), list(rows.all_rows()))
+        self.assertEqual(list(columnar.to_rows().all_rows()), list(rows.all_rows()))
+        self.assertFalse(columnar.to_rows().is_columnar())
+
+    def testFromColumns(self):
+        table = Table.from_columns([[1, 2, None], ["a", "b", "c"]], ["x", "y"])
+        self.assertEqual(table.data_rows(), [[1, "a"], [2, "b"], [None, "c"]])
+        self.assertEqual(table.column_count(), 2)
+
+
+    ##########
+    ## Data ##
+    ##########
+
+    def testShape(self):
+        table = Table(["a", "b"], [[1, 2], [3, 4]])
+        self.assertTrue(table.all_rows_equal_length())
+        self.assertEqual(table._row_length, 2)
+        self.assertEqual(table.column_count(), 2)
+
+        table = Table(["a", "b"], [[1, 2], [3]])
+        self.assertFalse(table.all_rows_equal_length())
+        self.assertEqual(table.column_count(), 2)
+
+        # The rows are returned as an iterator
+        table = Table(["a"], [[1], [2]])
+        rows = table.all_rows()
+        self.assertEqual(next(rows), ["a"])
+        self.assertEqual(list(rows), [[1], [2]])
+
+        # An empty table has no columns
+        table = Table()
+        self.assertEqual(table.column_count(), 0)
+        self.assertEqual(str(table), "Table with 0 rows and 0 columns")
+        with self.assertRaisesRegex(ValueError, "out of range"):
+            table.resolve_column(0)
+
+    def testSetupColumn(self):
+        for table in self.tables():
+            self.setUpColumns(table)
+            self.assertEqual(table.data_rows(), [
+                [0, 20.5 , "fast"],
+                [1, None , "slow"],
+                [2, 41.25, "fast"],
+                [3, None , "fast"],
+                [4, 45.0 , "slow"],
+            ])
+
+            with self.assertRaisesRegex(ValueError, "Header mismatch for column 1"):
+                table.setup_column(1, "temperature")
+
+    def testColumns(self):
+        for table in self.tables():
+            self.setUpColumns(table)
+            projected = table.columns(["mode", 0])
+            self.assertEqual(list(projected.all_rows()), [
+                ["mode", "time"],
+                ["fast", 0],
+                ["slow", 1],
+                ["fast", 2],
+                ["fast", 3],
+                ["slow", 4],
+            ])
+
+    def testFilter(self):
+        for table in self.tables():
+            self.setUpColumns(table)
+
+            # Dict form
+            self.assertEqual(table.filter({"mode": "slow"}).data_rows(), [
+                [1, None, "slow"],
+                [4, 45.0, "slow"],
+            ])
+
+            # List form with multiple conditions, None matches missing values
+            self.assertEqual(table.filter([("mode", "fast"), (1, None)]).data_rows(), [
+                [3, None, "fast"],
+            ])
+
+            # Function
+            self.assertEqual(table.filter(lambda t, temp, mode: t % 2 == 0).data_rows(), [
+                [0, 20.5 , "fast"],
+                [2, 41.25, "fast"],
+                [4, 45.0 , "slow"],
+            ])
+
+            # No match
+            self.assertEqual(table.filter({"mode": "medium"}).data_row_count(), 0)
+
+    def testViews(self):
+        for table in self.tables():
+            self.setUpColumns(table)
+
+            # Chained projections and filters
+            view = table.columns(["mode", "temp", "t"]).filter({"mode": "fast"}).columns([2, 1])
+            self.assertEqual(view.column_count(), 2)
+            self.assertEqual(view.data_row_count(), 3)
+            self.assertEqual(view.filter(lambda t, temp: temp is not None).data_rows(), [
+                [0, 20.5 ],
+                [2, 41.25],
+            ])
+            self.assertEqual(view.data_rows(), [
+                [0, 20.5 ],
+                [2, 41.25],
+                [3, None ],
+            ])
+
+            # Changing a view does not change the original table, and vice versa
+            slow = table.filter({"mode": "slow"})
+            slow.map_column("mode", str.upper)
+            table.map_column("t", lambda t: t * 10)
+            self.assertEqual(slow.data_rows(), [
+                [1, None, "SLOW"],
+                [4, 45.0, "SLOW"],
+            ])
+            self.assertEqual(table.column("mode")[:2].tolist() if table.is_columnar()
+                else table.column("mode")[:2], ["fast", "slow"])
+
+    def testFilterExpression(self):
+        for table in self.tables():
+            self.setUpColumns(table)
+            self.assertEqual(table.filter("temp > 40 and mode == 'fast' or t == 1").data_rows(), [
+                [1, None , "slow"],
+                [2, 41.25, "fast"],
+            ])
+
+            # On a view
+            view = table.columns(["mode", "temp"]).filter({"mode": "fast"})
+            self.assertEqual(view.filter("temp == None").data_rows(), [["fast", None]])
+
+            with self.assertRaises(ValueError):
+                table.filter("unknown > 1")
+
+    def testFilterIndexed(self):
+        for table in self.tables():
+            self.setUpColumns(table)
+            table.create_index("mode")
+            table.create_index("t")
+
+            # Index only
+            self.assertEqual(table.filter({"mode": "slow"}).data_rows(), [
+                [1, None, "slow"],
+                [4, 45.0, "slow"],
+            ])
+
+            # Two indexes
+            self.assertEqual(table.filter({"mode": "fast", "t": 2}).data_rows(), [
+                [2, 41.25, "fast"],
+            ])
+
+            # Index and non-indexed condition
+            self.assertEqual(table.filter({"mode": "fast", "temp": None}).data_rows(), [
+                [3, None, "fast"],
+            ])
+
+            # No match
+            self.assertEqual(table.filter({"mode": "medium"}).data_row_count(), 0)
+
+            # The index is rebuilt after the column has been changed
+            table.map_column("mode", str.upper)
+            self.assertEqual(table.filter({"mode": "slow"}).data_row_count(), 0)
+            self.assertEqual(table.filter({"mode": "SLOW"}).data_row_count(), 2)
+
+            # Unhashable value
+            self.assertEqual(table.filter({"mode": ["SLOW"]}).data_row_count(), 0)
+
+    def testGroupBy(self):
+        for table in self.tables():
+            self.setUpColumns(table)
+
+            # Single column
+            groups = table.group_by("mode")
+            self.assertEqual(list(groups), ["fast", "slow"])
+            self.assertEqual(list(groups["fast"].all_rows()), [
+                ["time", "temp", "mode"],
+                [0, 20.5 , "fast"],
+                [2, 41.25, "fast"],
+                [3, None , "fast"],
+            ])
+            self.assertEqual(groups["slow"].column("t").tolist() if table.is_columnar()
+                else groups["slow"].column("t"), [1, 4])
+
+            # Multiple columns
+            groups = table.group_by("mode", 1)
+            self.assertEqual(list(groups), [
+                ("fast", 20.5), ("slow", None), ("fast", 41.25), ("fast", None), ("slow", 45.0)])
+
+    def testGroupByNan(self):
+        # All NaN values are in one group
+        for columnar in [False, True]:
+            with self.subTest(columnar = columnar):
+                table = Table(None, [[float("nan"), "a"], [1.0, "b"], [float("nan"), "c"]],
+                    columnar=columnar)
+                groups = table.group_by(0)
+                self.assertEqual(len(groups), 2)
+                nan_key = next(key for key in groups if isnan(key))
+                self.assertEqual(groups[nan_key].column(1) if not columnar
+                    else groups[nan_key].column(1).tolist(), ["a", "c"])
+
+                groups = table.group_by(0, 0)
+                self.assertEqual(len(groups), 2)
+
+    def testColumn(self):
+        for table in self.tables():
+            self.setUpColumns(table)
+            temp = table.column("temp")
+            mode = table.column("mode")
+            if table.is_columnar():
+                self.assertEqual(temp.dtype.kind, "f")
+                self.assertEqual(temp[[0, 2, 4]].tolist(), [20.5, 41.25, 45.0])
+                self.assertTrue(all(isnan(value) for value in temp[[1, 3]].tolist()))
+                mode = mode.tolist()
+            else:
+                self.assertEqual(temp, [20.5, None, 41.25, None, 45.0])
+            self.assertEqual(mode, ["fast", "slow", "fast", "fast", "slow"])
+
+    def testMapColumn(self):
+        for table in self.tables():
+            self.setUpColumns(table)
+
+            table.map_column("temp", lambda temp: temp * 2)
+            self.assertEqual(table.columns(["temp"]).data_rows(), [[41.0], [None], [82.5], [None], [90.0]])
+
+            table.map_column("temp", lambda temp: temp / 2, vectorized = True)
+            self.assertEqual(table.columns(["temp"]).data_rows(), [[20.5], [None], [41.25], [None], [45.0]])
+
+    def testFormat(self):
+        for table in self.tables():
+            self.setUpColumns(table)
+            self.assertEqual(table.format(), "\n".join([
+                "---------------",
+                "time|temp |mode",
+                "---------------",
+                "0   |20.5 |fast",
+                "1   |None |slow",
+                "2   |41.25|fast",
+                "3   |None |fast",
+                "4   |45.0 |slow",
+                "---------------",
+            ]))
+
+            # Head and tail, written to a file in chunks
+            output = io.StringIO()
+            self.assertIsNone(table.format(" ", hlines=False, file=output, head=1, tail=2, chunk_size=2))
+            self.assertEqual(output.getvalue(), "\n".join([
+                "time temp mode",
+                "0    20.5 fast",
+                "...  ...  ... ",
+                "3    None fast",
+                "4    45.0 slow",
+            ]))
+
+    def testRecords(self):
+        class Record:
+            def __init__(self, t, temp, mode):
+                self.t = t
+                self.temp = temp
+                self.mode = mode
+
+        for table in self.tables():
+            self.setUpColumns(table)
+            records = table.records(Record)
+            self.assertEqual([r.t for r in records], [0, 1, 2, 3, 4])
+            self.assertEqual(records[2].temp, 41.25)
+
+            # Record array
+            records = table.records()
+            self.assertEqual(records.dtype.names, ("t", "temp", "mode"))
+            self.assertEqual(records.t.tolist(), [0, 1, 2, 3, 4])
+            self.assertEqual(records.temp.dtype.kind, "f")
+            self.assertTrue(isnan(records[1].temp))
+            self.assertEqual(records[2].mode, "fast")
+
+        # Columns with missing values that are not floats
+        records = Table.from_columns([[1, None], ["a", "b"]], ["x", "y"]).records()
+        self.assertEqual(records.dtype.names, ("x", "y"))
+        self.assertEqual(records.x.tolist(), [1, None])
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -94,6 +94,60 @@ class TestItem(unittest.TestCase):
         self.assertEqual(plot.containers(), [("series", plot.series)])
 
 
+    #############
+    ## Options ##
+    #############
+
+    def testOptionsSchema(self):
+        # The options schema is compiled once per class and shared by all
+        # instances.
+        calls = []
+
+        class Point(Item):
+            def register_options(self):
+                calls.append(self)
+                self.options.register("color", inherit=True)
+
+        point1 = Point()
+        point2 = Point(color = "red")
+        self.assertEqual(len(calls), 1)
+        self.assertIs(point1.options.schema, Point.options_schema())
+        self.assertIs(point2.options.schema, Point.options_schema())
+
+        # Each instance only has its own values
+        self.assertEqual(point1.options.resolve(pruneNotSpecified = True), {})
+        self.assertEqual(point2.options.resolve(), {"color": "red"})
+
+        # Different classes have different schemas
+        self.assertIsNot(self.Series.options_schema(), Point.options_schema())
+        self.assertIn("lineWidth", self.Series.options_schema())
+        self.assertNotIn("lineWidth", Point.options_schema())
+
+    def testOptionsSchemaSubclass(self):
+        # Subclasses can extend the options of their base class
+        class Base(Item):
+            def register_options(self):
+                self.options.register("color", inherit=True)
+
+        class Derived(Base):
+            def register_options(self):
+                super().register_options()
+                self.options.register("lineWidth")
+
+        class DerivedAgain(Derived):
+            def register_options(self):
+                super().register_options()
+                self.options.register("lineStyle")
+
+        item = DerivedAgain(color = "red", lineStyle = "dashed")
+        self.assertEqual(item.options.resolve(pruneNotSpecified = True),
+            {"color": "red", "lineStyle": "dashed"})
+        for name in ["color", "lineWidth", "lineStyle"]:
+            self.assertIn(name, DerivedAgain.options_schema())
+        self.assertNotIn("lineStyle", Derived.options_schema())
+        self.assertNotIn("lineWidth", Base.options_schema())
+
+
     ###############
     ## Templates ##
     ###############
@@ -580,6 +580,78 @@ class TestOptionsResolving(unittest.TestCase):
         # like testInheritanceFromObject, but set page.plots.all.a
         pass
 
+
+    ###########################
+    ## Incremental resolving ##
+    ###########################
+
+    # Resolved options are cached. Resolving again must reuse the cached options
+    # of items whose inputs have not changed, and must take all changes into
+    # account.
+
+    def testIncrementalUnchanged(self):
+        resolved1 = self.page.resolve_options()
+        resolved2 = self.page.resolve_options()
+
+        # The result is a new dict, but the options of the items are reused
+        self.assertIsNot(resolved1, resolved2)
+        self.assertEqual(resolved1, resolved2)
+        for item in resolved1:
+            self.assertIs(resolved1[item], resolved2[item])
+
+    def testIncrementalInstance(self):
+        resolved1 = self.page.resolve_options()
+        self.series[0][1].set(a=1)
+        resolved2 = self.page.resolve_options()
+
+        # Only the changed series is resolved again
+        self.assertEqual(resolved2[self.series[0][1]]["a"], 1)
+        for item in resolved1:
+            if item is not self.series[0][1]:
+                self.assertIs(resolved1[item], resolved2[item])
+
+        # Setting the option of a plot affects its children (through
+        # inheritance), but not the other plot
+        self.plots[0].set(a=2)
+        resolved3 = self.page.resolve_options()
+        self.assertEqual(resolved3[self.plots[0]    ]["a"], 2)
+        self.assertEqual(resolved3[self.series[0][0]]["a"], 2)
+        self.assertEqual(resolved3[self.series[0][1]]["a"], 1)
+        self.assertEqual(resolved3[self.legends[0]  ]["a"], 2)
+        self.assertIs(resolved2[self.plots[1]    ], resolved3[self.plots[1]    ])
+        self.assertIs(resolved2[self.series[1][0]], resolved3[self.series[1][0]])
+
+    def testIncrementalTemplates(self):
+        self.page.resolve_options()
+
+        # Set a container template option
+        self.page.plots.all.series["one"].set(a=1)
+        resolved = self.page.resolve_options()
+        self.assertEqual(resolved[self.series[0][0]]["a"], 1)
+        self.assertEqual(resolved[self.series[0][1]]["a"], "defaultA")
+
+        # Set a class template option
+        self.Series["two"].set(a=2)
+        resolved = self.page.resolve_options()
+        self.assertEqual(resolved[self.series[1][0]]["a"], 1)
+        self.assertEqual(resolved[self.series[1][1]]["a"], 2)
+
+        # Set an indirect option
+        self.legends[1].options.set_indirect("a", 3)
+        resolved = self.page.resolve_options()
+        self.assertEqual(resolved[self.legends[0]]["a"], "defaultA")
+        self.assertEqual(resolved[self.legends[1]]["a"], 3)
+
+    def testIncrementalAdd(self):
+        self.page.resolve_options()
+
+        plot = self.page.plots.add(tag="gamma")
+        series = plot.series.add(tag="one", a=1)
+        resolved = self.page.resolve_options()
+        self.assertEqual(resolved[plot]["a"], "defaultA")
+        self.assertEqual(resolved[series]["a"], 1)
+
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
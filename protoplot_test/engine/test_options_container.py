@@ -1,6 +1,6 @@
 import unittest
 
-from protoplot.engine.options_container import OptionsContainer, notSpecified
+from protoplot.engine.options_container import OptionsContainer, OptionsSchema, notSpecified
 
 # TODO Tests:
 #   * Copy an options container and modify either => modifications may not
@@ -299,6 +299,41 @@ class OptionsContainerTest(unittest.TestCase):
             "color"                : "yellow",
         })
 
+    def testResolveOrder(self):
+        oc = OptionsContainer()
+        oc.register("markerColor", defer = "color")
+        oc.register("color")
+
+        # The resolve order is cached...
+        self.assertEqual(oc.resolve_order(), ["color", "markerColor"])
+        self.assertIs(oc.schema.resolve_entries(), oc.schema.resolve_entries())
+
+        # ...until another option is registered
+        oc.register("color", defer = "lineColor")
+        oc.register("lineColor")
+        self.assertEqual(oc.resolve_order(), ["lineColor", "color", "markerColor"])
+
+    def testResolveOrderErrors(self):
+        # Deferral cycle
+        oc = OptionsContainer()
+        oc.register("a", defer = "b")
+        oc.register("b", defer = "c")
+        oc.register("c", defer = "a")
+        with self.assertRaisesRegex(ValueError, "^Deferral cycle: a -> b -> c -> a$"):
+            oc.resolve()
+
+        # Deferral to itself
+        oc = OptionsContainer()
+        oc.register("a", defer = "a")
+        with self.assertRaisesRegex(ValueError, "^Deferral cycle: a -> a$"):
+            oc.resolve()
+
+        # Deferral to an unknown option
+        oc = OptionsContainer()
+        oc.register("a", defer = "b")
+        with self.assertRaisesRegex(ValueError, "^Option a defers to unknown option b$"):
+            oc.resolve()
+
     def testResolvingDefault(self):
         # Define an OC and register options
         oc = OptionsContainer()
@@ -353,6 +388,30 @@ class OptionsContainerTest(unittest.TestCase):
         self.assertEqual(oc1.resolve(pruneNotSpecified = True), {"color": "blue"})
         self.assertEqual(oc2.resolve(pruneNotSpecified = True), {"color": "green"})
 
+    def testSharedSchema(self):
+        schema = OptionsSchema()
+        schema.register("color", default = "black")
+
+        oc1 = OptionsContainer(schema)
+        oc2 = OptionsContainer(schema)
+
+        # Containers created from a schema share it
+        self.assertIs(oc1.schema, schema)
+        self.assertIs(oc2.schema, schema)
+
+        # Values are not shared
+        oc1.set(color = "red")
+        self.assertEqual(oc1.resolve(), {"color": "red"})
+        self.assertEqual(oc2.resolve(), {"color": "black"})
+
+        # Registering an option copies the schema first, so the other container
+        # and the schema itself are not affected.
+        oc1.register("width", default = 1)
+        self.assertIsNot(oc1.schema, schema)
+        self.assertEqual(oc1.resolve(), {"color": "red", "width": 1})
+        self.assertEqual(oc2.resolve(), {"color": "black"})
+        self.assertNotIn("width", schema)
+
     def testUnknownOptions(self):
         pass
 
@@ -1,6 +1,6 @@
 import unittest
 
-from protoplot.engine.tag import make_tags_list
+from protoplot.engine.tag import make_tags_list, match_tags, TemplateIndex
 
 class TestTag(unittest.TestCase):
     '''
@@ -62,6 +62,41 @@ class TestTag(unittest.TestCase):
         tags = make_tags_list(["foo", "bar,baz"])
         self.assertEqual(tags, ["foo", "bar", "baz"])
 
+    def testMatchTags(self):
+        selectors = ["b", "", "a", "c"]
+
+        # The default selector comes first, the others in selector order
+        self.assertEqual(match_tags(selectors, []), [""])
+        self.assertEqual(match_tags(selectors, ["a"]), ["", "a"])
+        self.assertEqual(match_tags(selectors, ["a", "b", "x"]), ["", "b", "a"])
+
+    def testTemplateIndex(self):
+        class Template:
+            pass
+
+        index = TemplateIndex(Template)
+
+        # Templates are created on first access
+        self.assertNotIn("a", index)
+        a = index["a"]
+        self.assertIsInstance(a, Template)
+        self.assertIs(index["a"], a)
+
+        # Matching templates are in creation order, with the default template
+        # (created last here) first
+        b = index["b"]
+        default = index[""]
+        self.assertEqual(index.matching([])        , [default])
+        self.assertEqual(index.matching(["b", "a"]), [default, a, b])
+        self.assertEqual(index.matching(["b", "x"]), [default, b])
+
+        # Items with the same tags share the lookup
+        self.assertIs(index.matching(["a", "b"]), index.matching(["b", "a"]))
+
+        # Creating a template updates the matches
+        x = index["x"]
+        self.assertEqual(index.matching(["b", "x"]), [default, b, x])
+
 
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
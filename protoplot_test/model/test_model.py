@@ -1,5 +1,10 @@
+import copy
+import pickle
 import unittest
 
+import numpy as np
+
+from protoplot.data.table import Table
 from protoplot.model import Axis, Legend, Plot, Point, Series, Text
 
 class Test(unittest.TestCase):
@@ -15,6 +20,62 @@ class Test(unittest.TestCase):
         plot.series.add(x=[0, 1, 2, 3, 4], y=[0, 1, 2, 3, 4] , tag="linear")
         plot.series.add(x=[0, 1, 2, 3, 4], y=[0, 1, 4, 9, 16], tag="quadratic")
 
+    def testSeriesFromTable(self):
+        table = Table(["x", "y", "group"], [
+            [0, 1, "a"],
+            [1, 2, "b"],
+            [2, 3, "a"],
+        ], ["x", "y", "group"])
+
+        plot=Plot()
+        for group, data in table.group_by("group").items():
+            plot.series.add("x", 1, data=data, label=group)
+
+        self.assertEqual(len(plot.series.items), 2)
+        self.assertEqual(plot.series.items[0].x.tolist(), [0, 2])
+        self.assertEqual(plot.series.items[0].y.tolist(), [1, 3])
+        self.assertEqual(plot.series.items[1].x.tolist(), [1])
+        self.assertEqual(plot.series.items[1].y.tolist(), [2])
+
+    def testSeriesFromRecords(self):
+        records = Table(["x", "y"], [[0, 1], [1, 2]], ["x", "y"]).records()
+
+        series = Series("x", 1, data=records)
+        self.assertEqual(series.x.tolist(), [0, 1])
+        self.assertEqual(series.y.tolist(), [1, 2])
+
+    def testSeriesData(self):
+        # Numbers are converted to floats (None is NaN), dates are kept
+        series = Series(x=[0, 1, 2], y=[1.5, None, 2])
+        self.assertEqual(series.x.dtype, np.float64)
+        self.assertTrue(np.isnan(series.y[1]))
+
+        dates = np.array(["2020-01-01", "2020-01-02"], dtype="datetime64[D]")
+        self.assertEqual(Series(x=dates, y=[1, 2]).x.dtype, dates.dtype)
+        self.assertEqual(Series(x=list(dates), y=[1, 2]).x.dtype, dates.dtype)
+
+    def testPickle(self):
+        # Plots are pickled with their resolved options to be rendered in
+        # worker processes
+        plot = Plot(xlabel="x")
+        plot.series.add(x=[0, 1], y=[1, 2], color="red")
+        plot, options = pickle.loads(pickle.dumps((plot, plot.resolve_options())))
+
+        series = plot.series.items[0]
+        self.assertEqual(options[plot]["xlabel"], "x")
+        self.assertEqual(options[series]["color"], "red")
+        self.assertEqual(series.x.tolist(), [0, 1])
+
+        # The copy is a working item
+        series.set(color="blue")
+        self.assertEqual(plot.resolve_options()[series]["color"], "blue")
+
+    def testCopyKeepsData(self):
+        # Pickling and copying a series keeps its data
+        table = Table(["x"], [[0], [1]], ["x"])
+        series = Series("x", "x", data=table)
+        for copy_function in [lambda s: pickle.loads(pickle.dumps(s)), copy.copy, copy.deepcopy]:
+            self.assertEqual(copy_function(series).data.data_rows(), [[0], [1]])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+import contextlib
+import io
+import os
+import pickle
+import tempfile
+import unittest
+
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+import numpy as np
+
+from protoplot.data.table import Table
+from protoplot.model import Plot
+from protoplot.renderer import IncrementalRenderer, MplRenderer
+from protoplot.renderer.renderer import _render_payload
+
+class TestRenderer(unittest.TestCase):
+    ##################
+    ## Test fixture ##
+    ##################
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        plt.close("all")
+
+        # The renderer prints the options
+        self.stdout = contextlib.redirect_stdout(io.StringIO())
+        self.stdout.__enter__()
+
+    def tearDown(self):
+        self.stdout.__exit__(None, None, None)
+        self.directory.cleanup()
+
+    def plot(self, y):
+        plot = Plot()
+        plot.series.add(x=[0, 1, 2], y=y, color="red")
+        return plot
+
+    def file_name(self, name):
+        return os.path.join(self.directory.name, name)
+
+
+    ###########
+    ## Tests ##
+    ###########
+
+    def testSaveClosesFigure(self):
+        MplRenderer().save(self.plot([1, 2, 3]), self.file_name("a.png"))
+        self.assertTrue(os.path.exists(self.file_name("a.png")))
+        self.assertEqual(plt.get_fignums(), [])
+
+    def testWithoutPyplot(self):
+        renderer = MplRenderer(pyplot=False)
+        fig = renderer.render(self.plot([1, 2, 3]))
+        self.assertEqual(plt.get_fignums(), [])
+
+        fig.savefig(self.file_name("a.png"))
+        self.assertTrue(os.path.exists(self.file_name("a.png")))
+
+    def testSession(self):
+        for pyplot in [True, False]:
+            with self.subTest(pyplot = pyplot):
+                with MplRenderer(pyplot=pyplot).session() as session:
+                    first = session.render(self.plot([1, 2, 3]))
+                    second = session.render(self.plot([3, 2, 1]))
+
+                    # The figure is reused
+                    self.assertIs(first, second)
+                    self.assertEqual(len(second.axes), 1)
+                    self.assertEqual(second.axes[0].lines[0].get_ydata().tolist(), [3, 2, 1])
+
+                    session.save(self.plot([1, 2, 3]), self.file_name("a.png"))
+
+                self.assertEqual(plt.get_fignums(), [])
+
+    def testSaveAll(self):
+        file_names = [self.file_name("%d.png" % i) for i in range(2)] + [self.file_name("x/2.png")]
+
+        for max_workers in [1, 2]:
+            with self.subTest(max_workers = max_workers):
+                plots = (self.plot([1, 2, i]) for i in range(3))
+                errors = MplRenderer().save_all(plots, file_names, max_workers=max_workers)
+                self.assertEqual(list(errors), [self.file_name("x/2.png")])
+                self.assertEqual(sorted(os.listdir(self.directory.name)), ["0.png", "1.png"])
+                self.assertEqual(plt.get_fignums(), [])
+
+    def testPayloadWithoutData(self):
+        # Plots are sent to workers without the data of the series, only its
+        # values
+        table = Table.from_columns([list(range(100000)), [i % 50 for i in range(100000)]],
+            ["x", "group"], ["x", "group"])
+        plot = Plot()
+        for group, data in table.group_by("group").items():
+            if group < 3:
+                plot.series.add("x", "x", data=data)
+
+        payload = _render_payload(plot, plot.resolve_options(), "a.png")
+        self.assertLess(len(payload), 3 * 2 * 2000 * 8 + 10000)
+
+        copy, options, file_name = pickle.loads(payload)
+        series = copy.series.items[0]
+        self.assertIsNone(series.data)
+        self.assertEqual(series.x.tolist()[:2], [0, 50])
+        self.assertIn(series, options)
+        self.assertEqual(file_name, "a.png")
+
+        # The plot itself is unchanged
+        self.assertIsNotNone(plot.series.items[0].data)
+
+    def testBatchedSeries(self):
+        plot = Plot(batchSeries=True)
+        plot.series.add(x=[0, 1], y=[0, 1], color="red" , label="a")
+        plot.series.add(x=[0, 1], y=[1, 2], color="blue", label="b")
+        plot.series.add(x=[0, 1], y=[2, 3], color="red" , label="_hidden")
+        plot.series.add(x=[0, 1], y=[3, 4], color="red" , label="c")
+
+        renderer = MplRenderer(pyplot=False)
+        ax = renderer.render(plot).axes[0]
+
+        # One collection per style, and no individual lines
+        self.assertEqual(len(ax.lines), 0)
+        self.assertEqual(len(ax.collections), 2)
+        self.assertEqual(sorted(len(c.get_segments()) for c in ax.collections), [1, 3])
+
+        # Legend entries in the order of the series, without hidden labels
+        self.assertEqual([text.get_text() for text in ax.get_legend().get_texts()], ["a", "b", "c"])
+
+        handles, labels = renderer._render_series_batched(ax, plot.series.items,
+            plot.resolve_options(), [0] * 4, [0] * 4)
+        self.assertEqual(labels, ["a", "b", "c"])
+        self.assertEqual([handle.get_color() for handle in handles], ["red", "blue", "red"])
+
+    def testBatchedDates(self):
+        plot = Plot(batchSeries=True)
+        plot.series.add(x=np.arange("2020-01-01", "2020-01-04", dtype="datetime64[D]"),
+            y=[1, 2, 3], color="red")
+
+        ax = MplRenderer(pyplot=False).render(plot).axes[0]
+        self.assertEqual(len(ax.collections), 1)
+        self.assertEqual(type(ax.xaxis.get_major_formatter()).__name__, "AutoDateFormatter")
+
+        # The dates are converted to Matplotlib date numbers
+        segment = ax.collections[0].get_segments()[0]
+        self.assertEqual(segment[:, 0].tolist(), mdates.date2num(
+            np.arange("2020-01-01", "2020-01-04", dtype="datetime64[D]")).tolist())
+
+    def testIncremental(self):
+        for blit in [False, True]:
+            with self.subTest(blit = blit):
+                renderer = IncrementalRenderer(pyplot=False, blit=blit)
+                plot = self.plot([1, 2, 3])
+                figure = renderer.render(plot)
+                line = figure.axes[0].lines[0]
+
+                # New data: the line is updated
+                plot.series.items[0].y = [3, 2, 1]
+                self.assertIs(renderer.render(plot), figure)
+                self.assertIs(figure.axes[0].lines[0], line)
+                self.assertEqual(line.get_ydata().tolist(), [3, 2, 1])
+                self.assertEqual(line.get_animated(), blit)
+
+                # Changed style: the line is updated
+                plot.series.items[0].set(color="blue")
+                renderer.render(plot)
+                self.assertIs(figure.axes[0].lines[0], line)
+                self.assertEqual(line.get_color(), "blue")
+
+                # Additional series: the plot is rendered again in the same
+                # figure
+                plot.series.add(x=[0, 1], y=[0, 1], color="green")
+                self.assertIs(renderer.render(plot), figure)
+                self.assertEqual(len(figure.axes), 1)
+                self.assertEqual(len(figure.axes[0].lines), 2)
+                self.assertIsNot(figure.axes[0].lines[0], line)
+
+                renderer.save(plot, self.file_name("a.png"))
+                self.assertTrue(os.path.exists(self.file_name("a.png")))
+                renderer.close()
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
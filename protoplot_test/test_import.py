@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import protoplot
+
+class TestImport(unittest.TestCase):
+    '''
+    Importing protoplot must be cheap: the slow imports (Matplotlib, NumPy,
+    xlrd) are only done when they are used. The imports are checked in a new
+    interpreter, as other tests may already have imported the modules.
+    '''
+    def loaded_modules(self, code, modules):
+        # Runs the code in a new interpreter and returns the ones of the
+        # modules that have been imported (printed as the last line)
+        script = code + "\nimport sys\nprint(' '.join(m for m in %r if m in sys.modules))" % (modules,)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(protoplot.__file__)))
+        output = subprocess.check_output([sys.executable, "-c", script], cwd=root,
+            universal_newlines=True)
+        return output.splitlines()[-1].split()
+
+    def testImport(self):
+        modules = ["matplotlib", "matplotlib.pyplot", "xlrd"]
+        self.assertEqual(self.loaded_modules("import protoplot", modules + ["numpy"]), [])
+        self.assertEqual(self.loaded_modules("import protoplot.data.table", modules), [])
+
+        # Rendering without pyplot imports Matplotlib, but not pyplot
+        self.assertEqual(self.loaded_modules(
+            "import protoplot\n"
+            "plot = protoplot.Plot()\n"
+            "plot.series.add(x=[0, 1], y=[1, 2], color='red')\n"
+            "protoplot.MplRenderer(pyplot=False).render(plot)", modules), ["matplotlib"])
+
+    def testLazyAttributes(self):
+        from protoplot.renderer import MplRenderer
+        self.assertIs(protoplot.MplRenderer, MplRenderer)
+        self.assertIn("MplRenderer", dir(protoplot))
+
+        with self.assertRaises(AttributeError):
+            protoplot.NoSuchRenderer
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
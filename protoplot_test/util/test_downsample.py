@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+
+from protoplot.util.downsample import downsample, lttb, minmax
+
+class TestDownsample(unittest.TestCase):
+    def setUp(self):
+        self.x = np.arange(10000, dtype=float)
+        self.y = np.sin(self.x / 100)
+
+    def testMinMax(self):
+        x, y = minmax(self.x, self.y, 100)
+
+        # Four points per bucket at most, including the first, last, minimum
+        # and maximum point
+        self.assertLessEqual(len(x), 400)
+        self.assertEqual((x[0], x[-1]), (0, 9999))
+        self.assertEqual(y.min(), self.y.min())
+        self.assertEqual(y.max(), self.y.max())
+        self.assertTrue(np.all(np.diff(x) > 0))
+
+        # The points are a subset of the original points
+        self.assertTrue(np.all(self.y[x.astype(int)] == y))
+
+    def testMinMaxRange(self):
+        # Points outside of the range are reduced to one bucket on each side
+        x, y = minmax(self.x, self.y, 10, x_range=(4000, 5000))
+        self.assertLessEqual(len(x), 4 * 12)
+        self.assertEqual((x[0], x[-1]), (0, 9999))
+        self.assertLessEqual(np.count_nonzero(x < 4000), 4)
+
+        # Logarithmic axis
+        x, y = minmax(self.x + 1, self.y, 10, log=True)
+        self.assertLessEqual(len(x), 4 * 12)
+
+    def testMinMaxGaps(self):
+        y = self.y.copy()
+        y[5000] = np.nan
+        x, y = minmax(self.x, y, 10)
+        self.assertEqual(x[np.isnan(y)].tolist(), [5000])
+
+    def testLttb(self):
+        x, y = lttb(self.x, self.y, 500)
+        self.assertEqual(len(x), 500)
+        self.assertEqual((x[0], x[-1]), (0, 9999))
+        self.assertTrue(np.all(np.diff(x) > 0))
+        self.assertTrue(np.all(self.y[x.astype(int)] == y))
+
+        # The extremes of a sine are preserved
+        self.assertGreater(y.max(), 0.999)
+        self.assertLess(y.min(), -0.999)
+
+    def testUnchanged(self):
+        # Few points
+        x, y = downsample([0, 1, 2], [3, 4, 5], "minmax", 100)
+        self.assertEqual(x.tolist(), [0, 1, 2])
+
+        # Unsorted x values
+        x, y = downsample(self.x[::-1], self.y, "lttb", 100)
+        self.assertEqual(len(x), len(self.x))
+
+        # No method
+        x, y = downsample(self.x, self.y, None, 100)
+        self.assertIs(x, self.x)
+
+        with self.assertRaises(ValueError):
+            downsample(self.x, self.y, "unknown", 100)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 
-from protoplot.util.shift import offset
+import numpy as np
+
+from protoplot.util.shift import apply_offset, offset
 
 class TestShift(unittest.TestCase):
     def testNone(self):
@@ -19,6 +21,17 @@ class TestShift(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, "Length of shift_spec does not match count"):
             offset([1, 2.3, 4.56], 4)
 
+    def testApplyOffset(self):
+        self.assertEqual(apply_offset([1, 2, 3], 0).tolist(), [1, 2, 3])
+        self.assertEqual(apply_offset(range(3), 0.5).tolist(), [0.5, 1.5, 2.5])
+        self.assertEqual(apply_offset([1, 10, 100], 1, log=True).tolist(), [10, 100, 1000])
+
+        # Dates are not converted to numbers
+        dates = np.array(["2020-01-01", "2020-01-02"], dtype="datetime64[D]")
+        self.assertIs(apply_offset(dates, 0), dates)
+        self.assertEqual(apply_offset(dates, np.timedelta64(1, "D")).tolist(),
+            apply_offset(dates + 1, 0).tolist())
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
\ No newline at end of file